@@ -0,0 +1,316 @@
+"""
+=====
+Batch
+=====
+Runs many sub-requests in a single HTTP request. The sub-requests are resolved against the URL
+configuration and passed to the views directly, skipping the middleware. They are
+authenticated as the user of the batch request.
+
+Register the viewset with the router::
+
+    router.register('batch', BatchViewSet, base_name='batch')
+
+and post the list of sub-requests, ``method`` defaults to ``GET`` and ``body`` is sent as
+JSON::
+
+    [
+        {"method": "POST", "path": "/books", "body": {"title": "New"}, "name": "book"},
+        {"path": "/books/{result=book:$.id}/chapters"},
+        {"path": "/authors?page=2"}
+    ]
+
+The response lists the result of each sub-request in the same order. Each result has its
+``status_code`` and the same ``data`` / ``meta`` / ``error`` envelope the sub-request would have
+been responded with. Sub-requests are responded in JSON, streaming responses aren't supported
+and fail with 406 status.
+
+A sub-request can refer to the data of an earlier named one by ``{result=<name>:$.<path>}`` in
+its path or in the strings of its body, where path is dotted keys or list indexes. A string
+consisting of a single reference is replaced by the referred value as is. Sub-requests referring
+to failed ones aren't run and fail with 424 status.
+
+Consecutive read sub-requests not referring to each other run concurrently on a bounded thread
+pool. Everything runs sequentially in the request thread when the request is in a transaction,
+e.g. ``ATOMIC_REQUESTS``, as other threads wouldn't see its changes.
+"""
+import io
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.http import Http404
+from django.utils import translation
+from rest_framework import permissions as rf_permissions, serializers as rf_serializers, \
+    viewsets as rf_viewsets
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+from . import errors as err
+from .renderer import EnvelopeMixin
+
+try:
+    from django.urls import resolve
+except ImportError:
+    # Django < 1.10
+    from django.core.urlresolvers import resolve
+
+L = logging.getLogger('drf_ext.' + __name__)
+
+reference_re = re.compile(r'\{result=(?P<name>[\w-]+):\$(?P<path>(?:\.[\w-]+)*)\}')
+
+# Attributes set on the request by common middleware, shared with sub-requests
+_request_attrs = ('session', 'user', 'site', 'urlconf', 'LANGUAGE_CODE')
+# Headers of the batch request not applying to sub-requests
+_excluded_headers = ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+                     'HTTP_IF_UNMODIFIED_SINCE', 'HTTP_IF_RANGE')
+
+
+class BatchItemSerializer(rf_serializers.Serializer):
+    method = rf_serializers.ChoiceField(
+        choices=('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'), default='GET'
+    )
+    path = rf_serializers.CharField()
+    body = rf_serializers.JSONField(required=False)
+    name = rf_serializers.CharField(required=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('method'), str):
+            data = dict(data, method=data['method'].upper())
+        return super().to_internal_value(data)
+
+
+class BatchReferenceError(Exception):
+    """
+    Raised when a reference of sub-request can't be resolved
+
+    :param int status_code: Status the sub-request fails with
+    """
+
+    def __init__(self, message, status_code=400):
+        super(BatchReferenceError, self).__init__(message)
+        self.status_code = status_code
+
+
+def get_references(value):
+    """
+    Returns names of the results referred in the value
+    """
+    if isinstance(value, str):
+        return {match.group('name') for match in reference_re.finditer(value)}
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return set()
+
+    return set().union(*(get_references(item) for item in value))
+
+
+def _get_path(data, path):
+    for key in path.split('.')[1:]:
+        if isinstance(data, (list, tuple)) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        elif isinstance(data, dict) and key in data:
+            data = data[key]
+        else:
+            raise BatchReferenceError('Result has no %s' % path.lstrip('.'))
+    return data
+
+
+def substitute(value, results):
+    """
+    Replaces the references in the value by the data of referred results
+
+    :param value: Path or body of sub-request
+    :param dict results: Results of earlier sub-requests by name
+    :raises BatchReferenceError: If the referred result doesn't exist or is failed
+    """
+
+    def _lookup(match):
+        name = match.group('name')
+        if name not in results:
+            raise BatchReferenceError('Unknown result %s' % name)
+        result = results[name]
+        if result['status_code'] >= 400:
+            raise BatchReferenceError('Result %s is failed' % name, status_code=424)
+        return _get_path(result.get('data'), match.group('path'))
+
+    if isinstance(value, str):
+        match = reference_re.fullmatch(value)
+        if match is not None:
+            return _lookup(match)
+        return reference_re.sub(lambda m: str(_lookup(m)), value)
+    if isinstance(value, dict):
+        return {key: substitute(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, results) for item in value]
+
+    return value
+
+
+class BatchViewSet(rf_viewsets.ViewSet):
+    """
+    Runs the sub-requests posted as list, see module documentation
+
+    :param int max_batch_size: Maximum number of sub-requests in single request
+    :param int max_workers: Number of read sub-requests run concurrently
+    """
+    max_batch_size = 20
+    max_workers = 4
+
+    def create(self, request, *args, **kwargs):
+        data = request.data
+        if isinstance(data, list) and len(data) > self.max_batch_size:
+            detail, error_code = err.m.TOO_MANY_ITEMS
+            exc = rf_serializers.ValidationError(
+                {'detail': detail.format(limit=self.max_batch_size)}
+            )
+            exc.error_code = error_code
+            raise exc
+
+        serializer = BatchItemSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            if isinstance(serializer.errors, dict):
+                raise rf_serializers.ValidationError(serializer.errors)
+            raise err.ItemsValidationError(list(serializer.errors))
+
+        return Response(self.run(serializer.validated_data))
+
+    def run(self, items):
+        """
+        Runs the sub-requests, concurrently where possible, and returns their results
+        """
+        results = [None] * len(items)
+        named = {}
+        # Other threads don't see the changes of the transaction
+        concurrent = self.max_workers > 1 and not connection.in_atomic_block
+        group = []
+
+        def _flush():
+            if len(group) > 1:
+                language = translation.get_language()
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(group))) as executor:
+                    futures = [executor.submit(self._run_in_thread, items[i], named, language)
+                               for i in group]
+                    outcomes = [future.result() for future in futures]
+            else:
+                outcomes = [self.run_item(items[i], named) for i in group]
+
+            for i, result in zip(group, outcomes):
+                results[i] = result
+                if items[i].get('name'):
+                    named[items[i]['name']] = result
+            group.clear()
+
+        for i, item in enumerate(items):
+            depends = get_references(item['path']) | get_references(item.get('body'))
+            is_read = item['method'] in rf_permissions.SAFE_METHODS
+            if not concurrent or not is_read or \
+                    depends & {items[j].get('name') for j in group}:
+                _flush()
+            group.append(i)
+            if not concurrent or not is_read:
+                _flush()
+        _flush()
+
+        return results
+
+    def _run_in_thread(self, item, named, language):
+        # Same as a request handled by the server, the thread's connection is closed or reused
+        # as per CONN_MAX_AGE
+        close_old_connections()
+        translation.activate(language)
+        try:
+            return self.run_item(item, named)
+        finally:
+            translation.deactivate()
+            close_old_connections()
+
+    def run_item(self, item, named):
+        """
+        Runs single sub-request and returns its result
+        """
+        try:
+            path = substitute(item['path'], named)
+            body = substitute(item.get('body'), named)
+        except BatchReferenceError as e:
+            return self.get_error_result(e.status_code, str(e))
+
+        url = urlsplit(str(path))
+        try:
+            match = resolve(url.path, urlconf=getattr(self.request._request, 'urlconf', None))
+        except Http404:
+            return self.get_error_result(404, str(NotFound.default_detail))
+        if isinstance(getattr(match.func, 'cls', None), type) and \
+                issubclass(match.func.cls, BatchViewSet):
+            return self.get_error_result(400, 'Batch requests can\'t be nested')
+
+        request = self.get_sub_request(item['method'], url.path, url.query, body)
+        request.resolver_match = match
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Exception as e:
+            L.exception(e, extra={'request': request})
+            return self.get_error_result(500, str(err.m.UNEXPECTED[0]))
+
+        return self.get_result(response)
+
+    def get_sub_request(self, method, path, query, body):
+        """
+        Returns the request of sub-request, sharing the headers and the authentication of the
+        batch request except the conditional ones, accepting JSON only
+        """
+        request = self.request._request
+        content = b'' if body is None else json.dumps(body, cls=encoders.JSONEncoder).encode()
+
+        environ = {key: value for key, value in request.META.items()
+                   if not key.startswith('wsgi.') and key not in _excluded_headers}
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_ACCEPT': 'application/json',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(content)),
+            'wsgi.input': io.BytesIO(content),
+            'wsgi.url_scheme': request.META.get('wsgi.url_scheme', 'http'),
+        })
+        sub_request = WSGIRequest(environ)
+        for attr in _request_attrs:
+            if hasattr(request, attr):
+                setattr(sub_request, attr, getattr(request, attr))
+
+        # Authenticated once by the batch request
+        sub_request._force_auth_user = self.request.user
+        sub_request._force_auth_token = self.request.auth
+        # Session authentication checks CSRF, the batch request is already checked
+        sub_request._dont_enforce_csrf_checks = True
+
+        return sub_request
+
+    def get_result(self, response):
+        if getattr(response, 'streaming', False):
+            # Releasing the rows the stream holds, e.g. server side cursor
+            response.close()
+            return self.get_error_result(406, 'Streaming responses aren\'t supported in batch')
+
+        result = {'status_code': response.status_code}
+        if isinstance(response, Response):
+            if response.data is not None:
+                result.update(EnvelopeMixin().get_response_data(response.data))
+        elif response.content:
+            content = response.content.decode(response.charset)
+            try:
+                result['data'] = json.loads(content)
+            except ValueError:
+                result['data'] = content
+
+        return result
+
+    def get_error_result(self, status_code, detail):
+        return {'status_code': status_code, 'error': {'detail': detail,
+                                                      'status_code': status_code}}
@@ -0,0 +1,88 @@
+"""
+==========
+Build info
+==========
+Branch and commit of the running code. It's read from the stamp file written at build time by
+``manage.py write_build_info`` command, so no ``git`` process is spawned while serving.
+
+The stamp file path can be set by ``DRF_EXT_BUILD_INFO_FILE`` setting, default to
+``build_info.json`` under the current working directory. If the stamp file doesn't exist, it
+falls back to reading ``.git`` directory of the working directory.
+"""
+import json
+import os
+from functools import lru_cache
+
+from django.conf import settings
+
+DEFAULT_FILE_NAME = 'build_info.json'
+
+
+def get_stamp_path():
+    return getattr(settings, 'DRF_EXT_BUILD_INFO_FILE', None) or os.path.join(os.getcwd(),
+                                                                              DEFAULT_FILE_NAME)
+
+
+def read_git_dir(path='.git'):
+    """
+    Reads branch and commit hash from git directory without running git
+
+    :param str path: Path of git directory
+    :return dict: ``branch`` and ``commit`` keys, values are empty string if not found
+    """
+    info = {'branch': '', 'commit': ''}
+    try:
+        with open(os.path.join(path, 'HEAD')) as f:
+            head = f.read().strip()
+    except (IOError, OSError):
+        return info
+
+    if not head.startswith('ref:'):
+        # Detached head
+        info['commit'] = head
+        return info
+
+    ref = head[4:].strip()
+    info['branch'] = ref.replace('refs/heads/', '', 1)
+    try:
+        with open(os.path.join(path, ref)) as f:
+            info['commit'] = f.read().strip()
+    except (IOError, OSError):
+        # Ref may have been packed
+        try:
+            with open(os.path.join(path, 'packed-refs')) as f:
+                for line in f:
+                    parts = line.strip().split(' ')
+                    if len(parts) == 2 and parts[1] == ref:
+                        info['commit'] = parts[0]
+                        break
+        except (IOError, OSError):
+            pass
+
+    return info
+
+
+@lru_cache()
+def get_build_info():
+    """
+    Returns branch and commit of the running code. The result is cached for the life of the
+    process.
+
+    :return dict: ``branch`` and ``commit`` keys
+    """
+    try:
+        with open(get_stamp_path()) as f:
+            info = json.load(f)
+    except (IOError, OSError, ValueError):
+        info = read_git_dir()
+
+    return {'branch': info.get('branch', ''), 'commit': info.get('commit', '')}
+
+
+@lru_cache()
+def get_version():
+    """
+    Returns version string in ``branch#commit`` format
+    """
+    info = get_build_info()
+    return '%s#%s' % (info['branch'], info['commit'])
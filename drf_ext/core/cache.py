@@ -0,0 +1,131 @@
+"""
+==============
+Response cache
+==============
+Caches the responses of read actions, see :class:`~drf_ext.core.viewsets.CacheResponseMixin`.
+
+Cache keys include the version of the models the response depends on. The version of a model is
+bumped whenever its rows are saved or deleted (``post_save``, ``post_delete`` and
+``m2m_changed`` signals), so the responses built from the old rows are never hit again and
+expire on their own. Invalidation is a single cache operation, nothing is scanned.
+
+The signals are connected only for the models passed to :func:`register`, which is done for the
+model and ``cache_dependencies`` of the viewsets caching responses when they're registered with
+:class:`~drf_ext.core.routers.Router` and on their first cached request. Saves through other
+proxies of the model aren't seen.
+
+Bulk operations like ``QuerySet.update()`` don't send the signals, call
+:func:`bump_version_on_commit` after them. Processes writing the models without loading the URL
+configuration, e.g. task workers, need to :func:`register` the models.
+
+Uses the cache set by ``DRF_EXT_RESPONSE_CACHE_ALIAS`` setting, default to ``default``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+VERSION_KEY = 'drf_ext:version:%s'
+RESPONSE_KEY = 'drf_ext:response:%s'
+
+#: Models whose signals are connected, see register()
+_registered = set()
+
+
+def get_cache():
+    return caches[getattr(settings, 'DRF_EXT_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    # Proxy and deferred classes share the version of their concrete model
+    return VERSION_KEY % model._meta.concrete_model._meta.label
+
+
+def _new_version():
+    # Time based, so a version evicted from cache is never reused
+    return int(time.time() * 1000000)
+
+
+def get_versions(models):
+    """
+    Returns current versions of the models
+
+    :param list models: Model classes
+    :return list:
+    """
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """
+    Invalidates the cached responses depending on the model
+    """
+    cache = get_cache()
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not in cache
+        cache.set(key, _new_version(), None)
+
+
+def make_key(*parts):
+    """
+    Returns response cache key of the parts
+    """
+    return RESPONSE_KEY % hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def bump_version_on_commit(model, using=None):
+    """
+    Bumps the version once the current transaction is committed, so the responses built by
+    other requests meanwhile from the old rows aren't cached under the new version
+    """
+    transaction.on_commit(lambda: bump_version(model), using=using)
+
+
+def _on_change(sender, using=None, **kwargs):
+    bump_version_on_commit(sender, using)
+
+
+def _on_m2m_change(sender, instance, action, model, using=None, **kwargs):
+    if action.startswith('post_'):
+        for changed in (sender, instance.__class__, model):
+            bump_version_on_commit(changed, using)
+
+
+def register(*models):
+    """
+    Connects the signals bumping the version of the models on their changes, including the
+    changes of their many to many relations
+
+    :param models: Model classes
+    """
+    for model in models:
+        if model in _registered:
+            continue
+
+        for sender in {model, model._meta.concrete_model}:
+            uid = 'drf_ext.core.cache.%s' % sender._meta.label
+            post_save.connect(_on_change, sender=sender, dispatch_uid=uid + '.post_save')
+            post_delete.connect(_on_change, sender=sender, dispatch_uid=uid + '.post_delete')
+
+        for field in model._meta.get_fields(include_hidden=True):
+            if field.many_to_many:
+                through = getattr(field, 'through', None) or field.remote_field.through
+                m2m_changed.connect(_on_m2m_change, sender=through,
+                                    dispatch_uid='drf_ext.core.cache.%s.m2m_changed' %
+                                                 through._meta.label)
+
+        _registered.add(model)
@@ -0,0 +1,221 @@
+"""
+========
+Compiler
+========
+Compiles ``to_representation()`` of serializer classes into specialized functions. The source of
+the function is generated once per serializer class and field set, then bound to the fields of
+each serializer instance, e.g. once per list being serialized.
+
+The compiled function produces the same output as the serializer but skips the generic per field
+dispatch. Model fields are read as plain attributes, primary key related fields from the foreign
+key column and method fields call the serializer method directly. Other fields, including dotted
+``source`` and nested serializers, go through their ``get_attribute()``. Nested serializers are
+compiled as well if they opted in themselves.
+
+Serializers opt in by ``compile_representation = True`` option of their ``Meta`` class, see
+:class:`drf_ext.core.serializers.ListSerializer`.
+"""
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import fields as rf_fields, relations as rf_relations, \
+    serializers as rf_serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+#: Maximum number of cached compiled functions
+CACHE_SIZE = 1000
+
+#: Compiled builders by serializer class and field names, None if class can't be compiled
+_builders = {}
+
+# Field classes those representation is inlined
+_inline_representations = {
+    rf_fields.CharField.to_representation: 'str(value)',
+    rf_fields.IntegerField.to_representation: 'int(value)',
+}
+
+
+def is_enabled(serializer):
+    """
+    Returns True if the serializer opted in for the compiled representation
+    """
+    return getattr(getattr(serializer, 'Meta', None), 'compile_representation', False) is True
+
+
+def get_representation(serializer):
+    """
+    Returns the function representing instances of the serializer, compiled one if serializer
+    (the child of ListSerializer) opted in, its ``to_representation()`` otherwise
+    """
+    if is_enabled(getattr(serializer, 'child', serializer)):
+        return compile_representation(serializer)
+    return serializer.to_representation
+
+
+def compile_representation(serializer):
+    """
+    Returns compiled ``to_representation()`` bound to fields of the serializer instance. If the
+    serializer can't be compiled, e.g. it overrides ``to_representation()``, its method is
+    returned.
+
+    :param serializer: Serializer or ListSerializer instance
+    :return callable:
+    """
+    if isinstance(serializer, rf_serializers.ListSerializer):
+        if type(serializer).to_representation not in (
+                rf_serializers.ListSerializer.to_representation,
+                CompiledListMixin.to_representation):
+            return serializer.to_representation
+        return _list_representation(compile_representation(serializer.child))
+
+    fields = list(serializer._readable_fields)
+    key = (serializer.__class__, tuple(field.field_name for field in fields))
+    try:
+        builder = _builders[key]
+    except KeyError:
+        builder = _compile(serializer.__class__, fields)
+        if len(_builders) >= CACHE_SIZE:
+            _builders.clear()
+        _builders[key] = builder
+
+    if builder is None:
+        return serializer.to_representation
+
+    return builder(fields, serializer)
+
+
+class CompiledListMixin(object):
+    """
+    List serializer mixin representing the items by compiled function when child serializer opted
+    in
+    """
+
+    def to_representation(self, data):
+        if not is_enabled(self.child):
+            return super().to_representation(data)
+        return _list_representation(compile_representation(self.child))(data)
+
+
+def _list_representation(child):
+    def to_representation(data):
+        # Same as the ListSerializer, data can be a Manager of nested relationship
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        return [child(item) for item in iterable]
+
+    return to_representation
+
+
+def is_pk_only_field(field):
+    """
+    Returns True if the field represents the related object by its primary key as is, so the
+    value can be read from the foreign key column. Subclasses of ``PrimaryKeyRelatedField``
+    overriding the representation or the attribute lookup aren't.
+    """
+    field_class = type(field)
+    return (isinstance(field, rf_relations.PrimaryKeyRelatedField) and
+            field_class.to_representation is rf_relations.PrimaryKeyRelatedField.to_representation
+            and field_class.get_attribute is rf_relations.RelatedField.get_attribute)
+
+
+def _get_model_field(field, model):
+    """
+    Returns concrete model field the serializer field reads from directly or None
+    """
+    if model is None or len(field.source_attrs) != 1 or \
+            not field.source_attrs[0].isidentifier():
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if not getattr(model_field, 'concrete', False) or model_field.many_to_many:
+        return None
+    return model_field
+
+
+def _compile_field(index, field, model):
+    """
+    Returns the lines of the builder and the lines of the function for the field
+    """
+    name = repr(field.field_name)
+    model_field = _get_model_field(field, model)
+
+    if isinstance(field, rf_fields.SerializerMethodField):
+        return (['method%s = getattr(serializer, fields[%s].method_name)' % (index, index)],
+                ['ret[%s] = method%s(instance)' % (name, index)])
+
+    if model_field is not None and model_field.is_relation and is_pk_only_field(field):
+        if field.pk_field is None:
+            return [], ['ret[%s] = instance.%s' % (name, model_field.attname)]
+        return (['rep%s = fields[%s].pk_field.to_representation' % (index, index)],
+                ['value = instance.%s' % model_field.attname,
+                 'ret[%s] = None if value is None else rep%s(value)' % (name, index)])
+
+    if isinstance(field, rf_serializers.BaseSerializer):
+        builder = ['rep%s = get_representation(fields[%s])' % (index, index)]
+    else:
+        builder = ['rep%s = fields[%s].to_representation' % (index, index)]
+    representation = _inline_representations.get(type(field).to_representation,
+                                                  'rep%s(value)' % index)
+
+    if model_field is not None and not model_field.is_relation and \
+            not isinstance(field, (rf_serializers.BaseSerializer, rf_relations.RelatedField)) and \
+            type(field).get_attribute is rf_fields.Field.get_attribute:
+        return builder, ['value = instance.%s' % model_field.attname,
+                         'ret[%s] = None if value is None else %s' % (name, representation)]
+
+    builder.append('get%s = fields[%s].get_attribute' % (index, index))
+    return builder, [
+        'try:',
+        '    value = get%s(instance)' % index,
+        'except SkipField:',
+        '    pass',
+        'else:',
+        '    check_for_none = value.pk if isinstance(value, PKOnlyObject) else value',
+        '    ret[%s] = None if check_for_none is None else %s' % (name, representation),
+    ]
+
+
+def _compile(serializer_class, fields):
+    """
+    Generates the builder of representation function for the fields of serializer class
+
+    :return callable: Builder accepting the fields and serializer instance, None if the class
+    can't be compiled
+    """
+    if serializer_class.to_representation is not rf_serializers.Serializer.to_representation:
+        return None
+
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    builder_lines, function_lines = [], []
+    for index, field in enumerate(fields):
+        builder, function = _compile_field(index, field, model)
+        builder_lines.extend(builder)
+        function_lines.extend(function)
+
+    source = ['def build(fields, serializer):']
+    source.extend('    ' + line for line in builder_lines)
+    source.append('    fallback = serializer.to_representation')
+    source.append('    def to_representation(instance):')
+    if model is not None:
+        # Attributes are read directly only from model instances
+        source.append('        if not isinstance(instance, model):')
+        source.append('            return fallback(instance)')
+    source.append('        ret = OrderedDict()')
+    source.extend('        ' + line for line in function_lines)
+    source.append('        return ret')
+    source.append('    return to_representation')
+
+    namespace = {
+        'OrderedDict': OrderedDict,
+        'SkipField': SkipField,
+        'PKOnlyObject': PKOnlyObject,
+        'model': model,
+        'get_representation': get_representation,
+    }
+    exec(compile('\n'.join(source), '<compiled %s>' % serializer_class.__name__, 'exec'),
+         namespace)
+
+    return namespace['build']
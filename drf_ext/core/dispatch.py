@@ -5,7 +5,6 @@ Dispatch
 Identical to django.dispatch module but adds few more features
 """
 import django.dispatch
-from celery import shared_task
 
 
 def async_receiver(signal, sender=None, **kwargs):
@@ -15,6 +14,9 @@ def async_receiver(signal, sender=None, **kwargs):
     no additional changes are required while using in-built signals or custom signals.
     """
 
+    # Celery is imported only when it's used
+    from celery import shared_task
+
     def _decorator(func):
         # Convert normal function to celery task
         func_celery = shared_task(func, **kwargs)
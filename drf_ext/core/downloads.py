@@ -0,0 +1,206 @@
+"""
+=========
+Downloads
+=========
+Concurrent file downloader sharing a keep-alive connection pool between the downloads.
+
+Usage::
+
+    with Downloader(max_workers=16, timeout=(5, 60), max_size=50 * 1024 * 1024) as downloader:
+        for result in downloader.download_many(urls):
+            if result.error:
+                ...
+            else:
+                import_file(result.file.name)
+"""
+import io
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+L = logging.getLogger('drf_ext.' + __name__)
+
+
+class DownloadError(Exception):
+    """
+    Raised when the file can't be downloaded
+    """
+
+    def __init__(self, message, url=None, status_code=None):
+        super(DownloadError, self).__init__(message)
+        self.url = url
+        self.status_code = status_code
+
+
+class DownloadResult(object):
+    """
+    Outcome of a single download
+
+    :param str url: Downloaded URL
+    :param file: Closed ``NamedTemporaryFile`` or ``BytesIO`` positioned at start, None on error
+    :param int size: Number of bytes downloaded
+    :param Exception error: Error occurred, None on success
+    """
+    __slots__ = ('url', 'file', 'size', 'error')
+
+    def __init__(self, url, file=None, size=0, error=None):
+        self.url = url
+        self.file = file
+        self.size = size
+        self.error = error
+
+
+class Downloader(object):
+    """
+    Downloads files using a shared ``requests`` session and a bounded thread pool
+
+    :param int max_workers: Number of concurrent downloads, also the connection pool size
+    :param int chunk_size: Size of chunks read from response
+    :param float,tuple timeout: Connect and read timeout as accepted by ``requests``
+    :param int retries: Number of retries on connection errors, timeouts and retryable statuses
+    :param float backoff: Base delay in seconds between retries, doubled on each retry
+    :param int max_size: Maximum size of the file in bytes, None for no limit
+    :param bool to_memory: If True, files are downloaded to ``BytesIO`` instead of temp file
+    """
+    #: Response statuses those are retried
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_workers=8, chunk_size=64 * 1024, timeout=(5, 30), retries=3,
+                 backoff=0.5, max_size=None, to_memory=False):
+        import requests
+
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_size = max_size
+        self.to_memory = to_memory
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers,
+                                                pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def download(self, url):
+        """
+        Downloads single URL, retrying on transient errors
+
+        :param str url: URL to be downloaded
+        :return DownloadResult:
+        :raises DownloadError: When download fails after all the retries
+        """
+        import requests
+
+        attempt = 0
+        while True:
+            try:
+                return self._download(url)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                error = DownloadError(str(e), url=url)
+            except DownloadError as e:
+                if e.status_code not in self.retry_statuses:
+                    raise
+                error = e
+
+            if attempt >= self.retries:
+                raise error
+            delay = self.backoff * (2 ** attempt)
+            attempt += 1
+            L.info('Retrying download in %ss', delay, extra={'url': url, 'attempt': attempt})
+            time.sleep(delay)
+
+    def _download(self, url):
+        r = self.session.get(url, stream=True, timeout=self.timeout)
+        try:
+            if r.status_code >= 400:
+                raise DownloadError('Download failed with status %s' % r.status_code, url=url,
+                                    status_code=r.status_code)
+
+            content_length = r.headers.get('Content-Length')
+            if self.max_size and content_length and int(content_length) > self.max_size:
+                raise DownloadError('File size %s exceeds the limit' % content_length, url=url)
+
+            f = io.BytesIO() if self.to_memory else tempfile.NamedTemporaryFile(delete=False)
+            size = 0
+            try:
+                for chunk in r.iter_content(chunk_size=self.chunk_size):
+                    size += len(chunk)
+                    if self.max_size and size > self.max_size:
+                        raise DownloadError('File size exceeds the limit', url=url)
+                    f.write(chunk)
+            except Exception:
+                f.close()
+                if not self.to_memory:
+                    os.unlink(f.name)
+                raise
+        finally:
+            r.close()
+
+        if self.to_memory:
+            f.seek(0)
+        else:
+            f.close()
+
+        return DownloadResult(url, file=f, size=size)
+
+    def download_many(self, urls):
+        """
+        Downloads the URLs concurrently and yields the results as they complete. Failed
+        downloads are yielded with the ``error`` set instead of raising.
+
+        URLs are consumed lazily, at most ``max_workers * 2`` downloads are submitted at a time.
+        Closing the generator cancels the downloads not started yet and removes the files of
+        the ones not yielded.
+
+        :param iterable urls: URLs to be downloaded
+        :return generator: :class:`DownloadResult` objects
+        """
+        urls = iter(urls)
+        window = self.max_workers * 2
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+        try:
+            while True:
+                for url in islice(urls, window - len(pending)):
+                    pending[executor.submit(self.download, url)] = url
+                if not pending:
+                    break
+
+                done, __ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = DownloadResult(url, error=e)
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for future in pending:
+                self._discard(future)
+
+    def _discard(self, future):
+        # Removes the file of a download completed after the results are no longer consumed
+        if future.cancelled() or future.exception() is not None:
+            return
+        f = future.result().file
+        f.close()
+        if not self.to_memory:
+            os.unlink(f.name)
@@ -18,6 +18,12 @@ class Messages(object):
 
     #: System wide unexpected error
     UNEXPECTED = _('Unexpected error occurred'), -1
+    #: Resource has been changed since the version given by the client
+    PRECONDITION_FAILED = _('Resource has been modified'), -2
+    #: Some items of bulk request are invalid
+    INVALID_ITEMS = _('Invalid items at {positions}'), -3
+    #: Bulk request has more items than the view accepts
+    TOO_MANY_ITEMS = _('Number of items exceeds the limit of {limit}'), -4
 
 
 class APIException(exceptions.APIException):
@@ -34,4 +40,25 @@ class APIException(exceptions.APIException):
         self.error_code = error_code
 
 
+class PreconditionFailed(APIException):
+    """
+    Raised when the precondition of the request, e.g. ``If-Match`` header, isn't satisfied
+    """
+    status_code = 412
+
+
+class ItemsValidationError(exceptions.ValidationError):
+    """
+    Raised when items of bulk request are invalid. ``items`` of the detail holds the errors of
+    each item in the order of the request, empty for the valid ones.
+    """
+
+    def __init__(self, items):
+        positions = ', '.join(str(i) for i, item in enumerate(items) if item)
+        detail, self.error_code = Messages.INVALID_ITEMS
+        super(ItemsValidationError, self).__init__(
+            {'detail': detail.format(positions=positions), 'items': items}
+        )
+
+
 m = Messages
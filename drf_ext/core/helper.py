@@ -10,10 +10,9 @@ import logging
 import ntpath
 import re
 import sys
-import tempfile
+import time
 import traceback
 
-import requests
 from django.conf import settings
 from rest_framework.views import exception_handler
 
@@ -24,10 +23,74 @@ L = logging.getLogger('drf_ext.' + __name__)
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
 all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
+#: Maximum number of memoized key conversions of each direction
+KEY_CACHE_SIZE = 10000
+_camel_case_keys = {}
+_snake_case_keys = {}
+
+
+#: Last log time and suppressed count of expected errors, see _should_log()
+_error_log_state = {}
+
+
+def _get_culprit(exc):
+    """
+    Returns the originating location of exception as ``module in function`` by walking the
+    traceback, without reading any source files
+    """
+    tb = getattr(exc, '__traceback__', None) or sys.exc_info()[2]
+    if tb is None:
+        return None
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    frame = tb.tb_frame
+
+    return "%s in %s" % (frame.f_globals.get('__name__'), frame.f_code.co_name)
+
+
+def _get_full_culprit():
+    """
+    Returns the originating location of exception currently being handled using inspect
+    """
+    frm = inspect.trace()[-1]
+    mod = inspect.getmodule(frm[0])
+    func = traceback.extract_tb(sys.exc_info()[2])[-1][2]
+
+    return "%s in %s" % (getattr(mod, '__name__', None), func)
+
+
+def _should_log(key):
+    """
+    Rate limits logging of the same expected error to once per ``DRF_EXT_ERROR_LOG_INTERVAL``
+    seconds (default to 60, ``0`` logs everything).
+
+    :return int: Number of suppressed logs since last one, None if it shouldn't be logged
+    """
+    interval = getattr(settings, 'DRF_EXT_ERROR_LOG_INTERVAL', 60)
+    if not interval:
+        return 0
+
+    now = time.monotonic()
+    state = _error_log_state.get(key)
+    if state is not None and now - state[0] < interval:
+        state[1] += 1
+        return None
+
+    # Keeping the state bounded
+    if len(_error_log_state) >= 1000:
+        _error_log_state.clear()
+    _error_log_state[key] = [now, 0]
+
+    return state[1] if state is not None else 0
+
 
 def custom_exception_handler(exc, context):
     """
     Replace rest_framework's default handler to generate error response as per API specification
+
+    Expected errors, i.e. the ones rest framework produces response for, are logged as warning
+    only when the logger is enabled for it and repeated ones are rate limited, see
+    ``_should_log()``. Unexpected errors are always logged with full diagnostic.
     """
 
     #: Call REST framework's default exception handler first,
@@ -35,13 +98,6 @@ def custom_exception_handler(exc, context):
     response = exception_handler(exc, context)
     request = context.get('request')
 
-    # Getting originating location of exception
-    frm = inspect.trace()[-1]
-    mod = inspect.getmodule(frm[0])
-    func = traceback.extract_tb(sys.exc_info()[2])[-1][2]
-    log_extra = {'request': request, 'request_id': request.id,
-                 'culprit': "%s in %s" % (mod.__name__, func)}
-
     # Globally catch some typical error and transform them into API error
     # if isinstance(exc, me_error.NotUniqueError):
     # return custom_exception_handler(errors.DuplicateValueError('Some of the request values '
@@ -53,9 +109,16 @@ def custom_exception_handler(exc, context):
         return response
 
     if response:
-        L.warning(exc, extra=log_extra, exc_info=True)
+        if L.isEnabledFor(logging.WARNING):
+            culprit = _get_culprit(exc)
+            suppressed = _should_log((exc.__class__, response.status_code, culprit))
+            if suppressed is not None:
+                L.warning(exc, exc_info=True,
+                          extra={'request': request, 'request_id': getattr(request, 'id', None),
+                                 'culprit': culprit, 'suppressed': suppressed})
     else:
-        L.exception(exc, extra=log_extra)
+        L.exception(exc, extra={'request': request, 'request_id': getattr(request, 'id', None),
+                                'culprit': _get_full_culprit()})
 
     # Response is none, meaning builtin error handler failed to generate response and it needs to
     #  be converted to json response
@@ -144,6 +207,101 @@ def camel_to_snake_case(name):
     return all_cap_re.sub(r'\1_\2', s1).lower().replace(' ', '_')
 
 
+def snake_to_camel_case(name):
+    """
+    Converts given snake cased string to camel case. Names starting with underscore are returned
+    as is.
+
+    For eg:
+        - camel_camel_case -> camelCamelCase
+        - get2_http_response_code -> get2HttpResponseCode
+
+    :param str name: String to be converted
+    :return str: Converted string
+    """
+    if name.startswith('_') or '_' not in name:
+        return name
+    first, *rest = name.split('_')
+    return first + ''.join(part[:1].upper() + part[1:] for part in rest)
+
+
+def _convert_key(key, cache, func):
+    if not isinstance(key, str):
+        return key
+    converted = func(key)
+    if len(cache) < KEY_CACHE_SIZE:
+        cache[key] = converted
+    return converted
+
+
+_containers = (dict, list, tuple)
+
+
+def _convert_keys(data, cache, func, get=None):
+    # Recursing only into containers and looking the cache up inline keep it close to a copy
+    get = get or cache.get
+    if isinstance(data, dict):
+        return {(get(k) or _convert_key(k, cache, func)):
+                (_convert_keys(v, cache, func, get) if isinstance(v, _containers) else v)
+                for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_convert_keys(v, cache, func, get) if isinstance(v, _containers) else v
+                for v in data]
+    return data
+
+
+def camel_case_keys(data):
+    """
+    Recursively converts the keys of dicts in data to camel case. Conversions are memoized up to
+    ``KEY_CACHE_SIZE`` keys.
+
+    :param data: Data to be converted
+    :return: New converted data
+    """
+    return _convert_keys(data, _camel_case_keys, snake_to_camel_case)
+
+
+def snake_case_keys(data, names=None):
+    """
+    Recursively converts the keys of dicts in data to snake case. Conversions are memoized up to
+    ``KEY_CACHE_SIZE`` keys.
+
+    The conversion isn't reversible for all the names, e.g. ``address_line_1`` and
+    ``address_line1`` are both ``addressLine1`` in camel case. Keys found in ``names`` are
+    converted to the name they're mapped to instead.
+
+    :param data: Data to be converted
+    :param dict names: Snake cased names by their camel case, e.g. the field names of the
+        serializer
+    :return: New converted data
+    """
+    get = None
+    if names:
+        cache_get = _snake_case_keys.get
+
+        def get(key):
+            return names.get(key) or cache_get(key)
+
+    return _convert_keys(data, _snake_case_keys, camel_to_snake_case, get)
+
+
+def prime_camel_case_keys(names):
+    """
+    Memoizes the camel case conversion of given snake cased names in advance, so the hot keys
+    won't miss the bounded cache. The cache is started over once full.
+
+    :return bool: True if the cache is started over, i.e. the names primed earlier are dropped
+    """
+    cleared = len(_camel_case_keys) >= KEY_CACHE_SIZE
+    if cleared:
+        _camel_case_keys.clear()
+
+    for name in names:
+        _camel_case_keys[name] = snake_to_camel_case(name)
+
+    return cleared
+
+
 def snake_case_to_title(s):
     """
     Converts snake case string to title case
@@ -181,12 +339,16 @@ def sec2time(seconds):
     return "%d:%02d:%02d" % (h, m, s)
 
 
-def download_file(url: str):
-    f = tempfile.NamedTemporaryFile(delete=False)
-    # NOTE the stream=True parameter
-    r = requests.get(url, stream=True)
-    for chunk in r.iter_content(chunk_size=1024):
-        if chunk:  # filter out keep-alive new chunks
-            f.write(chunk)
-    f.close()
-    return f
+def download_file(url: str, **kwargs):
+    """
+    Downloads the URL to a temporary file. To download many files, use
+    :meth:`drf_ext.core.downloads.Downloader.download_many` that shares the connections.
+
+    :param str url: URL to be downloaded
+    :param kwargs: Options of :class:`drf_ext.core.downloads.Downloader`
+    :return NamedTemporaryFile: Closed file object
+    """
+    from .downloads import Downloader
+
+    with Downloader(max_workers=1, **kwargs) as downloader:
+        return downloader.download(url).file
@@ -0,0 +1,40 @@
+"""
+Writes the build info stamp file read by :mod:`drf_ext.core.build_info`. Meant to be run at
+build or deploy time, e.g. in Dockerfile.
+"""
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+
+from drf_ext.core import build_info
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(('git',) + args, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = 'Writes git branch and commit hash to the build info stamp file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', help='Branch name, read from git if not given')
+        parser.add_argument('--commit', help='Commit hash, read from git if not given')
+        parser.add_argument('--output', help='Path of the stamp file, default to '
+                                             'DRF_EXT_BUILD_INFO_FILE setting')
+
+    def handle(self, *args, **options):
+        commit = options['commit'] or _git('rev-parse', 'HEAD')
+        branch = options['branch']
+        if branch is None:
+            branch = _git('name-rev', '--name-only', commit) if commit else ''
+            branch = branch.replace('tags/', '').replace('^0', '')
+
+        path = options['output'] or build_info.get_stamp_path()
+        with open(path, 'w') as f:
+            json.dump({'branch': branch, 'commit': commit}, f)
+
+        self.stdout.write('Build info written to %s: %s#%s' % (path, branch, commit))
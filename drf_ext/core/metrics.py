@@ -0,0 +1,338 @@
+"""
+=======
+Metrics
+=======
+In-process metrics registry recording request latency, status codes and response sizes per
+viewset and action. The values are recorded by :class:`~drf_ext.core.middleware.MetricsMiddleware`
+and served in Prometheus text exposition format by :class:`MetricsViewSet`.
+
+With pre-forked workers, set ``DRF_EXT_METRICS_DIR`` to a directory shared by the workers. Each
+process then writes its values to its own memory-mapped file in that directory and the scrape
+aggregates all of them. The directory should be emptied when the server (re)starts. Without the
+setting values are kept in memory of the process.
+
+Usage::
+
+    router.register('metrics', MetricsViewSet, base_name='metrics')
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import viewsets as rf_viewsets
+
+#: Content type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+INF = float('inf')
+
+
+class ValueStore(object):
+    """
+    Keeps the values in memory of the process.
+
+    Each key gets a slot, i.e. an index in ``values``. Callers resolve the slots once and then
+    update ``values`` directly holding ``lock``, which keeps the hot path cheap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = []
+        #: Slots cache for the callers, see :func:`observe_request`
+        self.cache = {}
+        self._slots = {}
+
+    def _init_key(self, key):
+        self.values.append(0.0)
+        return len(self.values) - 1
+
+    def slot(self, key):
+        """
+        Returns the slot of the key, creating it if doesn't exist
+        """
+        index = self._slots.get(key)
+        if index is None:
+            with self.lock:
+                index = self._slots.get(key)
+                if index is None:
+                    index = self._slots[key] = self._init_key(key)
+
+        return index
+
+    def inc(self, key, amount=1.0):
+        index = self.slot(key)
+        with self.lock:
+            self.values[index] += amount
+
+    def items(self):
+        with self.lock:
+            return [(key, self.values[index]) for key, index in self._slots.items()]
+
+
+class MmapValueStore(ValueStore):
+    """
+    Keeps the values in a memory-mapped file, written by a single process only.
+
+    File layout is an 8 byte header holding the used size followed by the entries. Each entry is
+    a 4 byte key length, the JSON encoded key padded to 8 bytes and the value as double. ``values``
+    is the file viewed as array of doubles, so slot of a key is position of its value divided by 8.
+    """
+    _initial_size = 64 * 1024
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self._initial_size)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self.values = memoryview(self._mmap).cast('d')
+
+        self._used = struct.unpack_from('=i', self._mmap, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            struct.pack_into('=i', self._mmap, 0, self._used)
+
+        for key, value, pos in _read_entries(self._mmap, self._used):
+            self._slots[key] = pos // 8
+
+    def _init_key(self, key):
+        encoded = json.dumps([key[0], key[1], list(key[2])]).encode('utf-8')
+        padded = encoded + b' ' * (-(len(encoded) + 4) % 8)
+        entry = struct.pack('=i%ssd' % len(padded), len(padded), padded, 0.0)
+
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self.values.release()
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+            self.values = memoryview(self._mmap).cast('d')
+
+        self._mmap[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        # Header is updated after the entry is written so readers never see partial entry
+        struct.pack_into('=i', self._mmap, 0, self._used)
+
+        return (self._used - 8) // 8
+
+
+def _read_entries(data, used):
+    """
+    Yields the ``(key, value, value position)`` from the content of the metric file
+    """
+    pos = 8
+    while pos < used:
+        key_len = struct.unpack_from('=i', data, pos)[0]
+        pos += 4
+        name, suffix, labels = json.loads(bytes(data[pos:pos + key_len]).decode('utf-8'))
+        pos += key_len
+        value = struct.unpack_from('=d', data, pos)[0]
+        yield (name, suffix, tuple(labels)), value, pos
+        pos += 8
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Returns the value store of current process. A new store is created after the fork.
+    """
+    global _store, _store_pid
+
+    pid = os.getpid()
+    if _store is not None and _store_pid == pid:
+        return _store
+
+    with _store_lock:
+        if _store is None or _store_pid != pid:
+            directory = getattr(settings, 'DRF_EXT_METRICS_DIR', None)
+            if directory:
+                _store = MmapValueStore(os.path.join(directory, 'metrics_%s.db' % pid))
+            else:
+                _store = ValueStore()
+            _store_pid = pid
+
+    return _store
+
+
+def collect():
+    """
+    Returns the values aggregated across all the processes
+
+    :return dict: Values by ``(metric name, suffix, label values)`` key
+    """
+    values = {}
+    directory = getattr(settings, 'DRF_EXT_METRICS_DIR', None)
+
+    if directory:
+        for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < 8:
+                continue
+            for key, value, pos in _read_entries(data, struct.unpack_from('=i', data, 0)[0]):
+                values[key] = values.get(key, 0.0) + value
+    else:
+        values.update(get_store().items())
+
+    return values
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def expose(self, values):
+        raise NotImplementedError('Metric requires .expose() to be implemented')
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels, amount=1.0):
+        get_store().inc((self.name, '', labels), amount)
+
+    def expose(self, values):
+        for labels, value in sorted(values.get('', {}).items()):
+            yield _sample(self.name, self.labelnames, labels, value)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + ((INF,) if buckets[-1] != INF else ())
+        self._le = tuple('+Inf' if b == INF else repr(float(b)) for b in self.buckets)
+
+    def slots(self, store, labels):
+        """
+        Returns the slots of buckets, sum and count of the labels
+        """
+        return (tuple(store.slot((self.name, '_bucket', labels + (le,))) for le in self._le),
+                store.slot((self.name, '_sum', labels)),
+                store.slot((self.name, '_count', labels)))
+
+    def observe(self, labels, value):
+        store = get_store()
+        buckets, sum_slot, count_slot = self.slots(store, labels)
+        with store.lock:
+            # Buckets are stored non-cumulative, exposition sums them up
+            store.values[buckets[bisect_left(self.buckets, value)]] += 1
+            store.values[sum_slot] += value
+            store.values[count_slot] += 1
+
+    def expose(self, values):
+        buckets = values.get('_bucket', {})
+        sums = values.get('_sum', {})
+        for labels, count in sorted(values.get('_count', {}).items()):
+            cumulative = 0.0
+            for le in self._le:
+                cumulative += buckets.get(labels + (le,), 0.0)
+                yield _sample(self.name + '_bucket', self.labelnames + ('le',), labels + (le,),
+                              cumulative)
+            yield _sample(self.name + '_sum', self.labelnames, labels, sums.get(labels, 0.0))
+            yield _sample(self.name + '_count', self.labelnames, labels, count)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample(name, labelnames, labels, value):
+    if labelnames:
+        name = '%s{%s}' % (name, ','.join('%s="%s"' % (k, _escape(v))
+                                          for k, v in zip(labelnames, labels)))
+    return '%s %r' % (name, float(value))
+
+
+#: Registered metrics by name
+REGISTRY = OrderedDict()
+
+REQUESTS = Counter('drf_ext_http_requests_total', 'Total HTTP requests',
+                   ('view', 'action', 'method', 'status'))
+LATENCY = Histogram('drf_ext_http_request_duration_seconds', 'HTTP request latency',
+                    ('view', 'action'),
+                    (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+RESPONSE_SIZE = Histogram('drf_ext_http_response_size_bytes', 'HTTP response body size',
+                          ('view', 'action'),
+                          (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+
+
+def observe_request(view, action, method, status, duration, size=None):
+    """
+    Records a single request
+
+    :param str view: Name of the view
+    :param str action: Action of the viewset or HTTP method for other views
+    :param str method: HTTP method
+    :param int status: Response status code
+    :param float duration: Time taken in seconds
+    :param int size: Response body size, None for streamed response
+    """
+    store = get_store()
+    cache_key = (view, action, method, status)
+    slots = store.cache.get(cache_key)
+    if slots is None:
+        labels = (view, action)
+        slots = store.cache[cache_key] = (
+            (store.slot((REQUESTS.name, '', labels + (method, str(status)))),)
+            + LATENCY.slots(store, labels) + RESPONSE_SIZE.slots(store, labels)
+        )
+    request, lat_buckets, lat_sum, lat_count, size_buckets, size_sum, size_count = slots
+
+    with store.lock:
+        values = store.values
+        values[request] += 1
+        values[lat_buckets[bisect_left(LATENCY.buckets, duration)]] += 1
+        values[lat_sum] += duration
+        values[lat_count] += 1
+        if size is not None:
+            values[size_buckets[bisect_left(RESPONSE_SIZE.buckets, size)]] += 1
+            values[size_sum] += size
+            values[size_count] += 1
+
+
+def generate_latest():
+    """
+    Returns all the registered metrics in text exposition format
+    """
+    grouped = {}
+    for (name, suffix, labels), value in collect().items():
+        grouped.setdefault(name, {}).setdefault(suffix, {})[labels] = value
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append('# HELP %s %s' % (name, metric.documentation))
+        lines.append('# TYPE %s %s' % (name, metric.type))
+        lines.extend(metric.expose(grouped.get(name, {})))
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsViewSet(rf_viewsets.ViewSet):
+    """
+    Serves the metrics in text exposition format. Authentication and permission classes are
+    taken from rest framework settings, override them as needed.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return HttpResponse(generate_latest(), content_type=CONTENT_TYPE)
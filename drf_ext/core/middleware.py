@@ -3,16 +3,15 @@
 Middleware
 ===========
 """
+import re
 import socket
 import uuid
+import zlib
 
-import os
-from django.utils import timezone
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 
-# Getting branch and commit hash, we want to cache these to so declaring the here
-_p = os.popen('git name-rev --name-only $(git rev-parse HEAD)')
-branch = _p.read().replace('tags/', '').replace('^0', '').strip()
-commit_hash = os.popen('git rev-parse HEAD').read().strip()
+from . import build_info, metrics, timing
 
 
 class HeadInfoMiddleware(object):
@@ -21,25 +20,167 @@ class HeadInfoMiddleware(object):
 
     * ``X-Runtime``: Time to product the output
     * ``X-Request-Id``: UUID to identify the request
-    * ``X-Version``: Git commit hash and branch name
+    * ``X-Version``: Git commit hash and branch name, see :mod:`drf_ext.core.build_info`
     * ``X-Served-By``: Host name of the machine
+    * ``Server-Timing``: Time spent in each phase, see :mod:`drf_ext.core.timing`
+    * ``X-DB-Query-Count``, ``X-DB-Time``, ``X-DB-Duplicate-Queries`` and \
+    ``X-DB-Similar-Queries``: SQL statistics, see :mod:`drf_ext.core.queries`. Can be turned off \
+    by ``DRF_EXT_SQL_HEADERS = False``
+
+    All the per request state is kept on the request object as the middleware instance is shared
+    across the threads.
     """
-    request_id = None
-    start_time = None
 
     def process_request(self, request):
-        self.start_time = timezone.now()
-        self.request_id = uuid.uuid4().hex
-        request.id = self.request_id
+        timing.start(request)
+        request.id = uuid.uuid4().hex
 
     def process_response(self, request, response):
-        try:
-            response['X-Runtime'] = (timezone.now() - self.start_time).total_seconds()
-            response['X-Request-Id'] = self.request_id
-        except TypeError:
-            pass
-        response['X-Version'] = '%s#%s' % (branch, commit_hash)
+        timer = timing.stop(request)
+        if timer is not None:
+            response['X-Runtime'] = '%.6f' % timer.total
+            response['Server-Timing'] = timer.server_timing()
+            if getattr(settings, 'DRF_EXT_SQL_HEADERS', True):
+                for header, value in timer.queries.get_headers().items():
+                    response[header] = value
+            timer.queries.log(request, timer.view_name)
+
+        request_id = getattr(request, 'id', None)
+        if request_id:
+            response['X-Request-Id'] = request_id
+
+        response['X-Version'] = build_info.get_version()
         response['X-Served-By'] = socket.gethostname()
-        response['Content-Length'] = len(response.content)
+        if not response.streaming:
+            response['Content-Length'] = len(response.content)
+
+        return response
+
+
+def _parse_accept_encoding(value):
+    """
+    Returns dict of encoding and its quality value from ``Accept-Encoding`` header
+    """
+    encodings = {}
+    for item in value.split(','):
+        parts = item.strip().split(';')
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, val = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+
+    return encodings
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses response body using gzip or deflate as negotiated by ``Accept-Encoding`` header.
+
+    Streamed responses are compressed incrementally chunk by chunk, so the body is never buffered
+    as a whole.
+
+    Settings:
+
+    * ``DRF_EXT_COMPRESSION_MIN_SIZE``: Responses smaller than this (in bytes) aren't compressed, \
+    default to 1024. Not applicable for streamed responses.
+    * ``DRF_EXT_COMPRESSION_LEVEL``: zlib compression level, default to 6
+
+    It also reads below attribute in view class
+
+    :param int compression_level: Compression level for the view, ``0`` disables the compression
+    """
+    #: Supported encodings in preferred order and their zlib window bits
+    encodings = (('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_cls = getattr(view_func, 'cls', None)
+        request.compression_level = getattr(view_cls, 'compression_level', None)
+
+    def process_response(self, request, response):
+        level = getattr(request, 'compression_level', None)
+        if level is None:
+            level = getattr(settings, 'DRF_EXT_COMPRESSION_LEVEL', 6)
+        min_size = getattr(settings, 'DRF_EXT_COMPRESSION_MIN_SIZE', 1024)
+
+        if level == 0 or response.has_header('Content-Encoding'):
+            return response
+
+        # It's not worth attempting to compress really short responses.
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = _parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, wbits in self.encodings:
+            if accepted.get(encoding, accepted.get('*', 0)) > 0:
+                break
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_sequence(response.streaming_content,
+                                                                 level, wbits)
+            # We won't know the compressed size until we stream it
+            del response['Content-Length']
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+            content = compressor.compress(response.content) + compressor.flush()
+            # Return the compressed content only if it's actually shorter.
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub('"$', ';%s"' % encoding, response['ETag'])
+        response['Content-Encoding'] = encoding
+
+        return response
+
+    @staticmethod
+    def _compress_sequence(sequence, level, wbits):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        for chunk in sequence:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class MetricsMiddleware(object):
+    """
+    Records latency, status code and response size of each request per view and action in
+    :mod:`drf_ext.core.metrics`
+    """
+
+    def process_request(self, request):
+        request.metrics_start = timing.clock()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_cls = getattr(view_func, 'cls', None)
+        method = request.method.lower()
+        request.metrics_view = (
+            getattr(view_cls, '__name__', None) or getattr(view_func, '__name__', ''),
+            (getattr(view_func, 'actions', None) or {}).get(method, method)
+        )
+
+    def process_response(self, request, response):
+        start = getattr(request, 'metrics_start', None)
+        if start is None:
+            return response
+
+        view, action = getattr(request, 'metrics_view', ('', ''))
+        metrics.observe_request(view, action, request.method, response.status_code,
+                                timing.clock() - start,
+                                None if response.streaming else len(response.content))
 
         return response
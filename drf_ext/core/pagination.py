@@ -2,17 +2,504 @@
 Pagination
 ==========
 """
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, \
+    ValidationError as DjangoValidationError
+from django.core.paginator import EmptyPage, InvalidPage, Page as DjangoPage, \
+    PageNotAnInteger, Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework import pagination as rf_pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination as _PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from . import cache
+
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    # Django < 1.11
+    from django.db.models.sql.datastructures import EmptyResultSet
+
+
+def estimate_count(queryset):
+    """
+    Returns number of rows of the queryset estimated by the query planner of the database, None
+    if the database doesn't provide it. Only PostgreSQL is supported.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class Paginator(DjangoPaginator):
+    """
+    Paginator counting the objects by ``get_count`` callable returning ``(count, exact)``,
+    optionally in a separate thread while the page is fetched.
+
+    Pages are sliced by the page size only, so approximate count doesn't cut the last page. Page
+    past the end and the next page are found by the fetched objects instead of the count, which
+    is then needed only for the response.
+    """
+
+    def __init__(self, object_list, per_page, get_count=None, **kwargs):
+        super(Paginator, self).__init__(object_list, per_page, **kwargs)
+        self.get_count = get_count
+        self.count_exact = True
+        self._count = None
+        self._count_future = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            if self._count_future is not None:
+                self._count, self.count_exact = self._count_future.result()
+            elif self.get_count is not None:
+                self._count, self.count_exact = self.get_count(self.object_list)
+            else:
+                self._count = super(Paginator, self).count
+        return self._count
+
+    def start_count(self):
+        """
+        Starts counting in a separate thread, it uses its own database connection
+        """
+        if self._count is not None or self._count_future is not None:
+            return
+
+        get_count = self.get_count or (lambda object_list: (object_list.count(), True))
+
+        def _count():
+            try:
+                return get_count(self.object_list)
+            finally:
+                connections.close_all()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._count_future = executor.submit(_count)
+        executor.shutdown(wait=False)
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+
+        bottom = (number - 1) * self.per_page
+        # Orphans are joined to the page only if it's the last one
+        object_list = list(self.object_list[bottom:bottom + self.per_page + self.orphans + 1])
+        has_next = len(object_list) > self.per_page + self.orphans
+        if has_next:
+            object_list = object_list[:self.per_page]
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+
+        return self._get_page(object_list, number, self, has_next=has_next)
+
+    def _get_page(self, *args, **kwargs):
+        return Page(*args, **kwargs)
+
+
+class Page(DjangoPage):
+    """
+    Page knowing if there is next page from the fetched objects instead of the count
+    """
+
+    def __init__(self, object_list, number, paginator, has_next=False):
+        super(Page, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def next_page_number(self):
+        if not self._has_next:
+            raise EmptyPage('That page contains no results')
+        return self.number + 1
+
+    def previous_page_number(self):
+        # Not validated by the count, it may be an estimation
+        if self.number <= 1:
+            raise EmptyPage('That page number is less than 1')
+        return self.number - 1
 
 
 class PageNumberPagination(_PageNumberPagination):
     """
     Extends standard drf.PageNumberPagination class to enabled page_size param
+
+    Objects are counted by the count strategy, ``DRF_EXT_PAGINATION_COUNT`` setting by default
+
+    * ``exact`` (default): ``COUNT(*)`` on every request
+    * ``cached``: ``COUNT(*)`` cached per query, i.e. per filters and requesting owner, for
+      ``DRF_EXT_PAGINATION_COUNT_TIMEOUT`` seconds (default to 60). Cache is invalidated when the
+      model is written, see :mod:`drf_ext.core.cache`.
+    * ``estimated``: Estimation of the query planner, exact count when it's below
+      ``estimate_threshold`` or the database doesn't provide it. Only PostgreSQL is supported.
+
+    Unless the strategy is ``exact``, ``meta`` has ``count_exact`` telling if the count is
+    exact.
+
+    :param str count_strategy: Count strategy, default to the setting
+    :param bool concurrent_count: If True, objects are counted in a separate thread and database
+        connection while the page is fetched, default to ``DRF_EXT_PAGINATION_CONCURRENT_COUNT``
+        setting. It's worth only when the count is slower than opening a connection.
+    :param int estimate_threshold: Estimations below this are counted exactly
     """
     page_size_query_param = 'page_size'
     max_page_size = 100
+    django_paginator_class = Paginator
+    count_strategy = None
+    concurrent_count = None
+    estimate_threshold = 1000
+
+    #: Count strategies
+    EXACT, CACHED, ESTIMATED = 'exact', 'cached', 'estimated'
+
+    def get_count_strategy(self):
+        strategy = self.count_strategy or getattr(settings, 'DRF_EXT_PAGINATION_COUNT',
+                                                  self.EXACT)
+        if strategy not in (self.EXACT, self.CACHED, self.ESTIMATED):
+            raise ImproperlyConfigured('Unknown pagination count strategy %r' % strategy)
+        return strategy
+
+    def get_count(self, queryset):
+        """
+        Counts the objects of the queryset by the count strategy
+
+        :return tuple: ``(count, exact)``
+        """
+        strategy = self.get_count_strategy()
+        if strategy == self.EXACT or not hasattr(queryset, 'query'):
+            return self._exact_count(queryset), True
+
+        if strategy == self.ESTIMATED:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate, False
+            return queryset.count(), True
+
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0, True
+
+        cache.register(queryset.model)
+        response_cache = cache.get_cache()
+        key = cache.make_key('count', queryset.db, sql, params,
+                             cache.get_versions([queryset.model]))
+        count = response_cache.get(key)
+        if count is not None:
+            return count, False
+
+        count = queryset.count()
+        response_cache.set(key, count,
+                           getattr(settings, 'DRF_EXT_PAGINATION_COUNT_TIMEOUT', 60))
+
+        return count, True
+
+    def _exact_count(self, object_list):
+        try:
+            return object_list.count()
+        except (AttributeError, TypeError):
+            return len(object_list)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size, get_count=self.get_count)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            # Cached or estimated count may miss the last page
+            paginator._count, paginator.count_exact = self._exact_count(queryset), True
+            page_number = paginator.num_pages
+
+        concurrent_count = self.concurrent_count
+        if concurrent_count is None:
+            concurrent_count = getattr(settings, 'DRF_EXT_PAGINATION_CONCURRENT_COUNT', False)
+        # Other threads don't see the changes of the transaction
+        if concurrent_count is True and hasattr(queryset, 'db') and \
+                not connections[queryset.db].in_atomic_block:
+            paginator.start_count()
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        meta = [('count', paginator.count)]
+        if self.get_count_strategy() != self.EXACT:
+            meta.append(('count_exact', paginator.count_exact))
+
+        return Response(OrderedDict(meta + [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
 
 
 class NoPagination(PageNumberPagination):
     page_size = None
+
+
+#: Position of keyset cursor, i.e. values of the ordering fields
+Cursor = namedtuple('Cursor', ['position', 'reverse', 'inclusive'])
+
+
+class KeysetPagination(rf_pagination.CursorPagination):
+    """
+    Cursor pagination seeking the page by the values of the ordering fields of the last item, so
+    deep pages cost the same as the first one, unlike OFFSET and COUNT(*) of
+    :class:`PageNumberPagination`. Response has the same ``next`` and ``previous`` links, but no
+    ``count``.
+
+    Ordering is taken from the ordering filter of the view, if any, else ``ordering`` of the view
+    or this class, default to newest first by ``created_at`` of
+    :class:`drf_ext.db.models.Model`. Primary key is appended as tiebreaker unless a unique field
+    is already in the ordering. Ordering fields must be non nullable concrete fields of the model
+    and should be indexed together.
+
+    Cursors are opaque and bound to the ordering they were made by. Querysets of the
+    ``values_list()`` read path are supported, see
+    :class:`~drf_ext.core.viewsets.ValuesReadMixin`.
+    """
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return rf_pagination._positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns the ordering with the tiebreaker as list of ``(field, descending)``
+        """
+        ordering = None
+        ordering_filters = [backend for backend in getattr(view, 'filter_backends', [])
+                            if hasattr(backend, 'get_ordering')]
+        if ordering_filters:
+            ordering = ordering_filters[0]().get_ordering(request, queryset, view)
+        # Ordering filter has no ordering without the query param and ordering of the view
+        ordering = ordering or getattr(view, 'ordering', None) or self.ordering
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+        opts = queryset.model._meta
+        fields = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if not getattr(field, 'concrete', False) or field.many_to_many:
+                raise ImproperlyConfigured('Keyset pagination requires ordering by concrete '
+                                           'fields of the model, got %r' % name)
+            fields.append((field, descending))
+
+        if not any(field.unique for field, descending in fields):
+            fields.append((opts.pk, fields[-1][1] if fields else False))
+
+        return fields
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keyset = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.link_inclusive = False
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._get_seek_filter(self.cursor.position, reverse,
+                                                             self.cursor.inclusive))
+        queryset = queryset.order_by(*[
+            ('-' if descending != reverse else '') + field.attname
+            for field, descending in self.keyset
+        ])
+
+        rows, get_item, get_position = self._get_rows(queryset, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # The page is reached from the other direction, so there are items on that side unless
+        # it's reached back from the end
+        inclusive = self.cursor is not None and self.cursor.inclusive
+        self.has_next = has_more if not reverse else not inclusive
+        self.has_previous = has_more if reverse else self.cursor is not None and not inclusive
+        self.first_position = get_position(rows[0]) if rows else None
+        self.last_position = get_position(rows[-1]) if rows else None
+        if not rows and self.cursor is not None:
+            # Walked past the end, links lead back to where the cursor pointed, including the
+            # item there
+            self.first_position = self.last_position = self.cursor.position
+            self.has_next, self.has_previous = reverse, not reverse
+            self.link_inclusive = True
+
+        self.page = [get_item(row) for row in rows]
+        return self.page
+
+    def _get_seek_filter(self, position, reverse, inclusive=False):
+        """
+        Returns the filter of the rows after the position in the direction of the page, including
+        the row at the position if inclusive
+        """
+        seek, equal = Q(), Q()
+        for i, ((field, descending), value) in enumerate(zip(self.keyset, position)):
+            lookup = 'lt' if descending != reverse else 'gt'
+            if inclusive and i == len(self.keyset) - 1:
+                lookup += 'e'
+            seek |= equal & Q(**{'%s__%s' % (field.attname, lookup): value})
+            equal &= Q(**{field.attname: value})
+
+        # Bounding the leading field lets the database scan the index range only
+        field, descending = self.keyset[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{'%s__%s' % (field.attname, lookup): position[0]}) & seek
+
+    def _get_rows(self, queryset, limit):
+        """
+        Returns up to limit rows and the functions extracting the item and its position from a
+        row
+        """
+        fields = getattr(queryset, '_fields', None)
+        iterable_name = getattr(getattr(queryset, '_iterable_class', None), '__name__', '')
+        if not fields or not iterable_name.startswith(('Values', 'FlatValues')):
+            attnames = [field.attname for field, descending in self.keyset]
+            return list(queryset[:limit]), lambda obj: obj, \
+                lambda obj: [getattr(obj, attname) for attname in attnames]
+
+        # Rows of values() and values_list() are fetched along with the ordering columns
+        columns = list(fields)
+        indexes = []
+        for field, descending in self.keyset:
+            names = (field.name, field.attname) + (('pk',) if field.primary_key else ())
+            column = next((column for column in columns if column in names), None)
+            if column is None:
+                column = field.name
+                columns.append(column)
+            indexes.append(columns.index(column))
+
+        rows = list(queryset.values_list(*columns)[:limit])
+
+        def get_position(row):
+            return [row[index] for index in indexes]
+
+        if iterable_name == 'ValuesIterable':
+            return rows, lambda row: dict(zip(fields, row)), get_position
+        if iterable_name == 'FlatValuesListIterable':
+            return rows, lambda row: row[0], get_position
+
+        return rows, lambda row: row[:len(fields)], get_position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['o'] != self._get_ordering_key() or \
+                    len(cursor['p']) != len(self.keyset):
+                raise ValueError
+            position = [field.to_python(value)
+                        for (field, descending), value in zip(self.keyset, cursor['p'])]
+            reverse = bool(cursor.get('r'))
+            inclusive = bool(cursor.get('i'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(position=position, reverse=reverse, inclusive=inclusive)
+
+    def encode_cursor(self, cursor):
+        data = {'o': self._get_ordering_key(), 'p': [_cursor_value(value)
+                                                      for value in cursor.position]}
+        if cursor.reverse:
+            data['r'] = 1
+        if cursor.inclusive:
+            data['i'] = 1
+        encoded = urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded.decode('ascii'))
+
+    def _get_ordering_key(self):
+        return ','.join(('-' if descending else '') + field.attname
+                        for field, descending in self.keyset)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(position=self.last_position, reverse=False,
+                                         inclusive=self.link_inclusive))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(position=self.first_position, reverse=True,
+                                         inclusive=self.link_inclusive))
+
+
+def _cursor_value(value):
+    # Encoded for the standard json module in full precision, so the cursor seeks the exact
+    # position
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
@@ -0,0 +1,72 @@
+"""
+=======
+Parsers
+=======
+Parsers counterpart of the renderers in :mod:`drf_ext.core.renderer`
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from . import renderer
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses MessagePack encoded request body. Requires ``msgpack`` module.
+    """
+    media_type = 'application/msgpack'
+    renderer_class = renderer.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import msgpack
+
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
+
+
+class CBORParser(BaseParser):
+    """
+    Parses CBOR encoded request body. Requires ``cbor2`` module.
+    """
+    media_type = 'application/cbor'
+    renderer_class = renderer.CBORRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import cbor2
+
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            raise ParseError('CBOR parse error - %s' % exc)
+
+
+class CamelCaseJSONParser(JSONParser):
+    """
+    Parses JSON with camel cased keys and converts them to snake case. Keys of the fields of
+    view's serializer class are converted to the field names, e.g. ``addressLine1`` to
+    ``address_line_1``, others by :func:`~drf_ext.core.helper.camel_to_snake_case`.
+    """
+    renderer_class = renderer.CamelCaseJSONRenderer
+
+    def get_field_names(self, parser_context):
+        """
+        Returns the field names of view's serializer class by their camel case
+        """
+        view = (parser_context or {}).get('view')
+        if not hasattr(view, 'get_serializer_class'):
+            return None
+
+        try:
+            return renderer.get_camel_case_fields(view.get_serializer_class())
+        except Exception:
+            return None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        from . import helper
+
+        return helper.snake_case_keys(
+            super(CamelCaseJSONParser, self).parse(stream, media_type, parser_context),
+            self.get_field_names(parser_context)
+        )
@@ -0,0 +1,204 @@
+"""
+=======
+Planner
+=======
+Works out ``select_related()``/``prefetch_related()`` lookups from the structure of the model
+serializer, so the relations the serializer reads are loaded with the objects instead of a query
+per object. Single valued relations (forward foreign key and one to one) are joined, multi valued
+ones (reverse foreign key and many to many) and everything under them are prefetched.
+
+The plan is followed from ``source`` of the fields, nested serializers and related fields. Fields
+those value can't be known in advance, e.g. method fields and model properties, aren't planned.
+Primary key related fields read the foreign key column, so they aren't joined.
+
+:class:`~drf_ext.core.viewsets.GenericAPIView` applies the plan of its serializer class to the
+queryset of the read requests, see ``auto_prefetch`` attribute. The plans of all the views can be
+inspected with :class:`QueryPlanViewSet`::
+
+    router.register('debug/query-plans', QueryPlanViewSet, base_name='query-plans')
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import fields as rf_fields, permissions as rf_permissions, \
+    relations as rf_relations, serializers as rf_serializers, viewsets as rf_viewsets
+from rest_framework.response import Response
+
+try:
+    from django.urls import get_resolver
+except ImportError:
+    # Django < 1.10
+    from django.core.urlresolvers import get_resolver
+
+#: Maximum depth of nested serializers followed, guards recursive serializers
+MAX_DEPTH = 10
+
+#: Maximum number of cached plans
+CACHE_SIZE = 1000
+
+#: Cached plans by serializer class
+_plans = {}
+
+
+class QueryPlan(object):
+    """
+    Lookups to be loaded with the objects
+
+    :param list select_related: Lookups for ``select_related()``
+    :param list prefetch_related: Lookups for ``prefetch_related()``
+    """
+    __slots__ = ('select_related', 'prefetch_related')
+
+    def __init__(self, select_related=(), prefetch_related=()):
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+
+    def __bool__(self):
+        return bool(self.select_related or self.prefetch_related)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def as_dict(self):
+        return {'select_related': self.select_related, 'prefetch_related': self.prefetch_related}
+
+
+def _relation_attrs(field):
+    """
+    Returns the source attributes of the field those are relations to be loaded
+    """
+    if isinstance(field, (rf_serializers.BaseSerializer, rf_relations.ManyRelatedField)):
+        return field.source_attrs
+    if isinstance(field, rf_relations.RelatedField) and \
+            not isinstance(field, rf_relations.PrimaryKeyRelatedField):
+        return field.source_attrs
+    # Value of the last attribute is read from the object itself, including foreign key column
+    return field.source_attrs[:-1]
+
+
+def _plan_fields(serializer, model, path, many, lookups, depth):
+    """
+    Adds the lookups of the readable fields of serializer to ``lookups``, a list of
+    ``(lookup, many)``
+    """
+    if depth > MAX_DEPTH:
+        return
+
+    for field in serializer._readable_fields:
+        if isinstance(field, rf_fields.SerializerMethodField):
+            continue
+
+        field_model, field_path, field_many = model, path, many
+        for attr in _relation_attrs(field):
+            try:
+                model_field = field_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Property or method of the model, can't be planned any further
+                break
+            if not model_field.is_relation or model_field.related_model is None:
+                break
+
+            field_path = field_path + [attr]
+            field_many = field_many or model_field.many_to_many or model_field.one_to_many
+            lookups.append((LOOKUP_SEP.join(field_path), field_many))
+            field_model = model_field.related_model
+        else:
+            if isinstance(field, rf_serializers.ListSerializer):
+                field = field.child
+            if isinstance(field, rf_serializers.Serializer):
+                _plan_fields(field, field_model, field_path, field_many, lookups, depth + 1)
+
+
+def build_query_plan(serializer):
+    """
+    Returns :class:`QueryPlan` of the model serializer instance
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return QueryPlan()
+
+    lookups = []
+    _plan_fields(serializer, model, [], False, lookups, 0)
+
+    select_related, prefetch_related = [], []
+    for lookup, many in lookups:
+        target = prefetch_related if many else select_related
+        if lookup not in target:
+            target.append(lookup)
+
+    return QueryPlan(select_related, prefetch_related)
+
+
+def get_query_plan(serializer_class, get_serializer=None):
+    """
+    Returns :class:`QueryPlan` of the model serializer class. Result is cached per class, the
+    fields selected by ``?fields=`` are respected by using pruned serializer class, see
+    :meth:`drf_ext.core.serializers.Serializer.pruned_class`.
+
+    :param serializer_class: Model serializer class
+    :param callable get_serializer: Returns instance of the class, it's called only when result \
+    isn't cached yet. Default to instantiating the class without arguments.
+    :return QueryPlan:
+    """
+    try:
+        return _plans[serializer_class]
+    except KeyError:
+        pass
+
+    plan = build_query_plan(get_serializer() if get_serializer else serializer_class())
+    if len(_plans) >= CACHE_SIZE:
+        _plans.clear()
+    _plans[serializer_class] = plan
+
+    return plan
+
+
+def _iter_views(patterns, prefix=''):
+    """
+    Yields ``(url pattern, view class, actions)`` of the class based views of the URL patterns
+    """
+    for pattern in patterns:
+        # Django >= 2.0 keeps the regex or route in pattern attribute
+        url = prefix + str(getattr(pattern, 'pattern', None) or pattern.regex.pattern).lstrip('^')
+        if hasattr(pattern, 'url_patterns'):
+            yield from _iter_views(pattern.url_patterns, url)
+        else:
+            view_class = getattr(pattern.callback, 'cls', None)
+            if view_class is not None:
+                yield url, view_class, getattr(pattern.callback, 'actions', None) or {}
+
+
+class QueryPlanViewSet(rf_viewsets.ViewSet):
+    """
+    Lists the query plans of the read actions of the views in URL configuration, as applied for
+    the requesting user. ``?fields=`` is passed to the views. Only admin users are permitted by
+    default.
+    """
+    permission_classes = (rf_permissions.IsAdminUser,)
+
+    def list(self, request, *args, **kwargs):
+        plans = []
+        seen = set()
+        for url, view_class, actions in _iter_views(get_resolver().url_patterns):
+            action = actions.get('get', 'get')
+            if not hasattr(view_class, 'get_query_plan') or (view_class, action) in seen:
+                continue
+            seen.add((view_class, action))
+
+            item = {'url': url, 'view': view_class.__name__, 'action': action}
+            view = view_class()
+            view.request, view.args, view.kwargs = request, (), {}
+            view.format_kwarg, view.action = None, action
+            try:
+                item['serializer'] = view.get_serializer_class().__name__
+                plan = view.get_query_plan() or QueryPlan()
+            except Exception as e:
+                item['error'] = str(e)
+            else:
+                item.update(plan.as_dict())
+            plans.append(item)
+
+        return Response(plans)
@@ -0,0 +1,148 @@
+"""
+=======
+Queries
+=======
+Per request SQL statistics collected by the cursor hook of :mod:`drf_ext.core.timing`.
+
+Queries having the same SQL but different parameters are grouped as similar queries, that's
+the typical N+1 pattern of nested serializers or foreign key lookups done per object. When a
+group reaches ``DRF_EXT_SQL_SIMILAR_THRESHOLD`` executions, the serializer field (or the
+first frame out of the framework code) executing it is captured once, so it can be reported.
+"""
+import logging
+import os
+import sys
+
+from django.conf import settings
+from rest_framework.fields import Field
+
+L = logging.getLogger('drf_ext.' + __name__)
+
+#: Frames from these paths aren't considered as origin of the query
+_library_paths = tuple(
+    os.path.dirname(__import__(name).__file__) + os.sep
+    for name in ('django', 'rest_framework', 'rest_framework_extensions')
+) + (os.path.dirname(os.path.abspath(__file__)) + os.sep,)
+
+
+def _find_origin():
+    """
+    Walks the stack to find the serializer field and the code that executed the query
+    """
+    field = location = None
+    frame = sys._getframe(3)
+    while frame is not None and (field is None or location is None):
+        code = frame.f_code
+        if field is None and code.co_name == 'to_representation':
+            f_locals = frame.f_locals
+            if isinstance(f_locals.get('field'), Field) and 'self' in f_locals:
+                field = '%s.%s' % (f_locals['self'].__class__.__name__,
+                                   f_locals['field'].field_name)
+        if location is None and not code.co_filename.startswith(_library_paths):
+            location = '%s:%s in %s' % (code.co_filename, frame.f_lineno, code.co_name)
+        frame = frame.f_back
+
+    return field, location
+
+
+class QueryGroup(object):
+    """
+    Queries sharing the same SQL
+    """
+    __slots__ = ('sql', 'count', 'duration', 'params', 'duplicates', 'field', 'location')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.params = set()
+        self.duplicates = 0
+        self.field = None
+        self.location = None
+
+    def as_dict(self):
+        return {'sql': self.sql, 'count': self.count, 'duplicates': self.duplicates,
+                'duration': round(self.duration * 1000, 3), 'field': self.field,
+                'location': self.location}
+
+
+class QueryStats(object):
+    """
+    Collects the statistics of the queries executed during a request
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.groups = {}
+        self.similar_threshold = getattr(settings, 'DRF_EXT_SQL_SIMILAR_THRESHOLD', 5)
+
+    def add(self, sql, params, duration):
+        self.count += 1
+        self.duration += duration
+
+        group = self.groups.get(sql)
+        if group is None:
+            group = self.groups[sql] = QueryGroup(sql)
+        group.count += 1
+        group.duration += duration
+
+        try:
+            key = repr(params)
+        except Exception:
+            key = None
+        if key in group.params:
+            group.duplicates += 1
+        else:
+            group.params.add(key)
+
+        if group.count == self.similar_threshold:
+            group.field, group.location = _find_origin()
+
+    @property
+    def duplicates(self):
+        """
+        Number of queries executed with exactly same SQL and parameters more than once
+        """
+        return sum(group.duplicates for group in self.groups.values())
+
+    @property
+    def similar(self):
+        """
+        List of query groups those are executed at least ``DRF_EXT_SQL_SIMILAR_THRESHOLD`` times
+        """
+        groups = [group for group in self.groups.values()
+                  if group.count >= self.similar_threshold]
+        groups.sort(key=lambda g: g.count, reverse=True)
+
+        return groups
+
+    def get_headers(self):
+        """
+        Returns dict of response headers
+        """
+        return {
+            'X-DB-Query-Count': str(self.count),
+            'X-DB-Time': '%.3f' % (self.duration * 1000),
+            'X-DB-Duplicate-Queries': str(self.duplicates),
+            'X-DB-Similar-Queries': str(len(self.similar)),
+        }
+
+    def log(self, request, view_name=None):
+        """
+        Logs the statistics when ``DRF_EXT_SQL_COUNT_THRESHOLD`` is exceeded or any N+1 pattern
+        is found
+        """
+        count_threshold = getattr(settings, 'DRF_EXT_SQL_COUNT_THRESHOLD', 50)
+        similar = self.similar
+
+        if self.count <= count_threshold and not similar:
+            return
+
+        L.warning('%s queries executed (%s similar query groups) in %s %s',
+                  self.count, len(similar), request.method, request.path,
+                  extra={'request': request, 'request_id': getattr(request, 'id', None),
+                         'view': view_name, 'query_count': self.count,
+                         'db_time': round(self.duration * 1000, 3),
+                         'duplicates': self.duplicates,
+                         'similar_queries': [group.as_dict() for group in similar]})
@@ -37,19 +37,121 @@ When error occurs::
         }
     }
 """
-from rest_framework.renderers import JSONRenderer as RFJSONRenderer
+import csv
+import io
+import json
+from functools import lru_cache
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.compat import INDENT_SEPARATORS, LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import BaseRenderer, JSONRenderer as RFJSONRenderer
+from rest_framework.utils import encoders
 
-class JSONRenderer(RFJSONRenderer):
+#: Field names by camel case by serializer class, see get_camel_case_fields()
+_camel_case_fields = {}
+
+
+def get_camel_case_fields(serializer_class):
     """
-    Override the ``render()`` of the rest framework JSONRenderer to produce JSON output as per \
-    API specification
+    Returns the field names of the serializer class, including the ones of nested serializers,
+    by their camel case. Classes pruned by ``?fields=`` are considered as the class they're
+    pruned from. Result is cached per class.
+
+    :return dict:
     """
+    from . import helper
+    from .serializers import CACHE_SIZE
 
-    def render(self, data, accepted_media_type=None, renderer_context=None):
+    serializer_class = vars(serializer_class).get('_unpruned_class', serializer_class)
+    try:
+        return _camel_case_fields[serializer_class]
+    except KeyError:
+        pass
+
+    names = {}
+    try:
+        stack = [serializer_class().fields]
+    except Exception:
+        stack = []
+    while stack:
+        fields = stack.pop()
+        for name, field in fields.items():
+            names.setdefault(helper.snake_to_camel_case(name), name)
+            field = getattr(field, 'child', field)
+            if hasattr(field, 'fields'):
+                stack.append(field.fields)
+
+    if len(_camel_case_fields) >= CACHE_SIZE:
+        _camel_case_fields.clear()
+    _camel_case_fields[serializer_class] = names
+
+    return names
+
+
+def orjson_dumps(data, default):
+    """
+    Encodes data using ``orjson``. Date and time objects are passed to ``default`` so they are
+    formatted the same way as rest framework's encoder does.
+    """
+    import orjson
+
+    ret = orjson.dumps(data, default=default,
+                       option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    # Keep the output a strict javascript subset, same as rest framework does
+    return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+@lru_cache()
+def get_encoder_backend():
+    """
+    Returns the encoder function configured by ``DRF_EXT_JSON_ENCODER`` setting or None if
+    standard ``json`` module should be used.
+
+    Accepted values are
+
+    * ``auto`` (default): ``orjson`` if it's installed else ``json``
+    * ``orjson``
+    * ``json``
+    * Dotted path to a callable with ``(data, default)`` signature returning bytes
+    """
+    name = getattr(settings, 'DRF_EXT_JSON_ENCODER', 'auto')
+
+    if name == 'json':
+        return None
+
+    if name in ('auto', 'orjson'):
+        try:
+            import orjson  # noqa
+        except ImportError:
+            if name == 'orjson':
+                raise ImproperlyConfigured('DRF_EXT_JSON_ENCODER is set to orjson but it is not '
+                                           'installed')
+            return None
+        return orjson_dumps
+
+    return import_string(name)
+
+
+class EnvelopeMixin(object):
+    """
+    Splits the response data into the envelope parts as per API specification. Shared by all
+    the renderers of this module so every format produces the same ``data`` / ``meta`` /
+    ``error`` structure.
+    """
+
+    def get_envelope(self, data):
+        """
+        Returns the context, payload and meta of the response data
+
+        :param data: Response data
+        :return tuple: ``(context, data, meta)`` where context is either ``data`` or ``error`` \
+        and meta is None for non paginated response
+        """
         from . import helper
 
-        response_data = {}
         context = 'data'  # Default
 
         # When exception handler will pass the response, we would expect
@@ -84,15 +186,287 @@ class JSONRenderer(RFJSONRenderer):
                 data['detail'] = detail
 
         # check if the results have been paginated
+        meta = None
         if isinstance(data, dict) and 'results' in data:
-            # add the resource key and copy the results
-            response_data[context] = data.pop('results')
-            response_data['meta'] = data
+            meta = data
+            data = meta.pop('results')
+
+        return context, data, meta
+
+    def get_response_data(self, data):
+        """
+        Returns the response data wrapped in the envelope as new dict
+        """
+        context, data, meta = self.get_envelope(data)
+        response_data = {context: data}
+        if meta is not None:
+            response_data['meta'] = meta
+
+        return response_data
+
+
+class JSONRenderer(EnvelopeMixin, RFJSONRenderer):
+    """
+    Override the ``render()`` of the rest framework JSONRenderer to produce JSON output as per \
+    API specification
+
+    The encoding is done by backend returned from :func:`get_encoder_backend`. The faster backend
+    is only used for compact, non indented and unicode output, which is rest framework's default,
+    otherwise it falls back to standard ``json`` module. Output of both are same except for
+    floats in exponent notation and ``NaN``/``Infinity``.
+    """
+
+    def encode(self, data, indent=None):
+        """
+        Encodes data to JSON bytes
+
+        :param data: Data to be encoded
+        :param int indent: Indentation level
+        :return bytes:
+        """
+        backend = get_encoder_backend()
+        if backend is not None and indent is None and self.compact and not self.ensure_ascii:
+            try:
+                return backend(data, self.encoder_class().default)
+            except TypeError:
+                # Such as integers that don't fit in 64 bit, let standard encoder deal with it
+                pass
+
+        if indent is None:
+            separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
         else:
-            response_data[context] = data
+            separators = INDENT_SEPARATORS
+
+        ret = json.dumps(data, cls=self.encoder_class, indent=indent,
+                         ensure_ascii=self.ensure_ascii, separators=separators)
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+        return ret.encode('utf-8')
+
+    def get_separators(self):
+        """
+        Returns the item and key separators as bytes for writing the envelope
+        """
+        item_sep, key_sep = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        return item_sep.encode('utf-8'), key_sep.encode('utf-8')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            return self.encode(self.get_response_data(data), indent)
+
+        # Writing the envelope directly instead of copying the payload to a new dict
+        context, data, meta = self.get_envelope(data)
+        item_sep, key_sep = self.get_separators()
+        ret = b'{"' + context.encode('utf-8') + b'"' + key_sep + self.encode(data)
+        if meta is not None:
+            ret += item_sep + b'"meta"' + key_sep + self.encode(meta)
+
+        return ret + b'}'
+
+
+class CamelCaseJSONRenderer(JSONRenderer):
+    """
+    Renders the keys in camel case, counterpart of
+    :class:`~drf_ext.core.parsers.CamelCaseJSONParser`
+
+    :param bool precompute_field_names: If True, the field names of view's serializer class are \
+    converted once per class in advance
+    """
+    precompute_field_names = True
+
+    #: Serializer classes whose field names are already converted, bounded by
+    #: :data:`drf_ext.core.serializers.CACHE_SIZE`
+    _primed_classes = set()
+
+    def get_envelope(self, data):
+        from . import helper
+
+        context, data, meta = super(CamelCaseJSONRenderer, self).get_envelope(data)
+
+        return context, helper.camel_case_keys(data), helper.camel_case_keys(meta)
+
+    def prime_serializer(self, serializer_class):
+        from . import helper
+        from .serializers import CACHE_SIZE
+
+        if serializer_class is None:
+            return
+        # Classes pruned by ?fields= have subset of the names of the class they're pruned from
+        serializer_class = vars(serializer_class).get('_unpruned_class', serializer_class)
+        if serializer_class in self._primed_classes:
+            return
+
+        if helper.prime_camel_case_keys(get_camel_case_fields(serializer_class).values()) or \
+                len(self._primed_classes) >= CACHE_SIZE:
+            # Names of the other classes are dropped from the key cache
+            self._primed_classes.clear()
+        self._primed_classes.add(serializer_class)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        view = (renderer_context or {}).get('view')
+        if self.precompute_field_names and hasattr(view, 'get_serializer_class'):
+            try:
+                self.prime_serializer(view.get_serializer_class())
+            except Exception:
+                pass
+
+        return super(CamelCaseJSONRenderer, self).render(data, accepted_media_type,
+                                                         renderer_context)
+
+
+class StreamingRendererMixin(object):
+    """
+    Mixin for renderers that can produce the output chunk by chunk from an iterable of rows.
+
+    ``render_stream()`` returns a generator of bytes that can be handed to
+    ``StreamingHttpResponse``. ``render()`` is still available for the non streamed responses.
+
+    :param int stream_buffer_size: Number of bytes to be collected before yielding a chunk
+    """
+    stream_buffer_size = 64 * 1024
+
+    def render_stream(self, rows, meta=None, accepted_media_type=None, renderer_context=None):
+        raise NotImplementedError('Streaming renderer requires .render_stream() to be implemented')
+
+    def _buffered(self, chunks):
+        """
+        Joins small chunks so the response isn't written to the socket row by row
+        """
+        buf, size = [], 0
+        for chunk in chunks:
+            buf.append(chunk)
+            size += len(chunk)
+            if size >= self.stream_buffer_size:
+                yield b''.join(buf)
+                buf, size = [], 0
+        if buf:
+            yield b''.join(buf)
+
+
+class JSONStreamRenderer(StreamingRendererMixin, JSONRenderer):
+    """
+    JSON renderer that streams the list in the same ``data`` / ``meta`` envelope produced by
+    :class:`JSONRenderer`
+    """
+
+    def render_stream(self, rows, meta=None, accepted_media_type=None, renderer_context=None):
+        item_sep, key_sep = self.get_separators()
+
+        def _chunks():
+            yield b'{"data"' + key_sep + b'['
+            for i, row in enumerate(rows):
+                if i:
+                    yield item_sep
+                yield self.encode(row)
+            yield b']'
+            if meta is not None:
+                yield item_sep + b'"meta"' + key_sep + self.encode(meta)
+            yield b'}'
+
+        return self._buffered(_chunks())
+
+
+class NDJSONRenderer(StreamingRendererMixin, JSONRenderer):
+    """
+    Renders list as newline delimited JSON, one object per line. Suitable for bulk exports.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_stream(self, rows, meta=None, accepted_media_type=None, renderer_context=None):
+        # Indentation would break the one object per line format
+        return self._buffered(self.encode(row) + b'\n' for row in rows)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        if isinstance(data, dict):
+            data = data.get('results', [data])
+
+        return b''.join(self.render_stream(data))
+
+
+class CSVRenderer(StreamingRendererMixin, JSONRenderer):
+    """
+    Renders list as CSV. Header is taken from the keys of the first row and nested values are
+    written as JSON string.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def _format_value(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return self.encode(value).decode('utf-8')
+        return value
+
+    def render_stream(self, rows, meta=None, accepted_media_type=None, renderer_context=None):
+        def _chunks():
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            header = None
+            for row in rows:
+                if header is None:
+                    header = list(row.keys())
+                    writer.writerow(header)
+                writer.writerow([self._format_value(row.get(k)) for k in header])
+                yield buf.getvalue().encode(self.charset)
+                buf.seek(0)
+                buf.truncate()
+
+        return self._buffered(_chunks())
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        if isinstance(data, dict):
+            data = data.get('results', [data])
+
+        return b''.join(self.render_stream(data))
+
+
+class MessagePackRenderer(EnvelopeMixin, BaseRenderer):
+    """
+    Renders the response envelope as MessagePack. Requires ``msgpack`` module.
+
+    Types that MessagePack doesn't support are converted the same way as JSON renderer does.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+
+        return msgpack.packb(self.get_response_data(data), use_bin_type=True,
+                             default=encoders.JSONEncoder().default)
+
+
+class CBORRenderer(EnvelopeMixin, BaseRenderer):
+    """
+    Renders the response envelope as CBOR. Requires ``cbor2`` module.
+
+    Date/time, decimal and UUID values are written using CBOR's own tags, naive datetimes are
+    considered UTC when ``USE_TZ`` is on. Other types that CBOR doesn't support are converted the
+    same way as JSON renderer does.
+    """
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import cbor2
+
+        json_default = encoders.JSONEncoder().default
+
+        def _default(encoder, value):
+            encoder.encode(json_default(value))
 
-        # call super to render the response
-        response = super(JSONRenderer, self).render(response_data, accepted_media_type,
-                                                    renderer_context)
+        tz = timezone.utc if settings.USE_TZ else None
 
-        return response
+        return cbor2.dumps(self.get_response_data(data), default=_default, timezone=tz)
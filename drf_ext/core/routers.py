@@ -14,12 +14,37 @@ class Router(rf_routers.SimpleRouter):
     """
     Extends simple router with default trailing_slash to False.
 
-    It also converts endpoint name starts with ``action?_`` to ``/actions/...``
+    It also converts endpoint name starts with ``action?_`` to ``/actions/...`` and maps the
+    bulk actions enabled by ``bulk_actions`` of the viewset to the list endpoint, see
+    :class:`~drf_ext.core.viewsets.BulkMixin`
     """
+    #: HTTP methods of the list endpoint by bulk action
+    bulk_methods = {'partial_update': 'patch', 'destroy': 'delete'}
 
     def __init__(self):
         super().__init__(trailing_slash=False)
 
+    def register(self, prefix, viewset, *args, **kwargs):
+        super().register(prefix, viewset, *args, **kwargs)
+
+        # Connecting the signals invalidating the cached responses of the viewset in each process
+        # loading the URL configuration, see CacheResponseMixin
+        if hasattr(viewset, 'register_cache_models'):
+            viewset.register_cache_models()
+
+    def get_method_map(self, viewset, method_map):
+        bound_methods = super().get_method_map(viewset, method_map)
+
+        # Bulk create is handled by create action itself
+        if method_map.get('get') == 'list':
+            for action in getattr(viewset, 'bulk_actions', ()):
+                method = self.bulk_methods.get(action)
+                if method is not None and method not in method_map and \
+                        hasattr(viewset, 'bulk_%s' % action):
+                    bound_methods[method] = 'bulk_%s' % action
+
+        return bound_methods
+
     def get_urls(self):
         urls = super().get_urls()
 
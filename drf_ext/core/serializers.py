@@ -4,8 +4,151 @@ Serializers
 ===========
 """
 
-from django.db.models import ForeignKey
-from rest_framework import serializers as rf_serializers
+import copy
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.db.models import Case, ForeignKey, Value, When
+from django.utils import timezone
+from rest_framework import fields as rf_fields, relations as rf_relations, \
+    serializers as rf_serializers
+from rest_framework.settings import api_settings
+from rest_framework.utils import html, model_meta
+from rest_framework.validators import UniqueValidator
+
+from . import cache
+from .compiler import CompiledListMixin, is_pk_only_field
+
+
+#: Maximum number of entries kept in each of the caches of this module
+CACHE_SIZE = 1000
+
+#: Cached pruned serializer classes by serializer class and field names, see pruned_class()
+_pruned_classes = {}
+#: Cached model field names by serializer class, see get_source_fields()
+_source_fields = {}
+#: Built fields by serializer class and field names, see Serializer.get_fields()
+_field_templates = {}
+#: Cached classes of Serializer.subserializer_class() by serializer class and field names
+_subserializer_classes = {}
+
+
+def _cache_set(cache, key, value):
+    # Keeping the caches bounded as the keys may come from the request
+    if len(cache) >= CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+
+
+def _clone_value(value):
+    if isinstance(value, rf_fields.Field):
+        return _clone_field(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_clone_value(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _clone_value(item) for key, item in value.items()}
+    return copy.deepcopy(value)
+
+
+def _clone_validator(validator):
+    # Validators with set_context() keep the state of the request, e.g. UniqueValidator.instance.
+    # Others are shared the way rest framework does, as Django's RegexValidator can't be copied.
+    return copy.deepcopy(validator) if hasattr(validator, 'set_context') else validator
+
+
+def _clone_field(field):
+    """
+    Returns new instance of the field built from its arguments, same as ``Field.__deepcopy__``
+    but nothing holding the state of a request is shared with the original, including the
+    validators and the child fields
+    """
+    kwargs = dict(field._kwargs)
+    validators = kwargs.pop('validators', None)
+    kwargs = {key: _clone_value(value) for key, value in kwargs.items()}
+    if validators is not None:
+        kwargs['validators'] = [_clone_validator(validator) for validator in validators]
+
+    return field.__class__(*[_clone_value(arg) for arg in field._args], **kwargs)
+
+
+def parse_fields(fields):
+    """
+    Returns the names of the selected fields
+
+    :param list,str fields: Field names as list or comma separated str, e.g. ``?fields=`` value
+    :return frozenset: Field names, None if no field is selected
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return frozenset(fields)
+
+
+class PrimaryKeyRelatedField(rf_relations.PrimaryKeyRelatedField):
+    """
+    Primary key related field those objects can be resolved in batch by :meth:`resolve` before
+    the validation, see :meth:`Serializer.resolve_related_pks`. PKs not in the batch are resolved
+    one by one as usual.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resolved = None
+        self._looked_up = frozenset()
+
+    def get_pk(self, data):
+        """
+        Returns the primary key value of the input, None if it isn't valid
+        """
+        try:
+            if self.pk_field is not None:
+                data = self.pk_field.to_internal_value(data)
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+            hash(pk)
+        except (TypeError, ValueError, rf_serializers.ValidationError, DjangoValidationError):
+            return None
+        return pk
+
+    def resolve(self, pks):
+        """
+        Fetches the objects of given primary keys with single query
+        """
+        pks = frozenset(pks)
+        self._resolved = {obj.pk: obj for obj in self.get_queryset().filter(pk__in=pks)} \
+            if pks else {}
+        self._looked_up = pks
+
+    def to_internal_value(self, data):
+        if self._resolved is not None:
+            pk = self.get_pk(data)
+            if pk is not None and pk in self._looked_up:
+                try:
+                    return self._resolved[pk]
+                except KeyError:
+                    # Same as the query, error reports the value after pk_field conversion
+                    self.fail('does_not_exist', pk_value=data if self.pk_field is None else
+                              self.pk_field.to_internal_value(data))
+
+        return super().to_internal_value(data)
+
+
+class ListSerializer(CompiledListMixin, rf_serializers.ListSerializer):
+    """
+    Default list serializer of the serializers of this module. Items are represented by compiled
+    function when child serializer sets ``compile_representation = True`` in its ``Meta``, see
+    :mod:`drf_ext.core.compiler`.
+
+    Related primary keys of all the items are resolved in batch before the validation.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and hasattr(self.child, 'resolve_related_pks'):
+            self.child.resolve_related_pks(data)
+
+        return super().to_internal_value(data)
 
 
 class Serializer(rf_serializers.Serializer):
@@ -13,6 +156,12 @@ class Serializer(rf_serializers.Serializer):
     Base serializer that adds a feature of dynamically allow selection fields in response.
     """
 
+    #: Names of the fields to be built, None for all fields, see pruned_class()
+    only_fields = None
+    #: If True, the fields are built once per class and field set and then copied for each
+    #: instance. Turn on only if the fields don't depend on the instance, e.g. its context.
+    cache_fields = False
+
     def __init__(self, *args, **kwargs):
         _fields = kwargs.pop('fields', None)
         super(Serializer, self).__init__(*args, **kwargs)
@@ -22,21 +171,139 @@ class Serializer(rf_serializers.Serializer):
             fields = self.context.get('request').GET.get('fields')
         except AttributeError:
             fields = _fields
-        if fields:
-            if isinstance(fields, str):
-                fields = fields.split(',')
-            allowed = set(fields)
-            existing = set(self.fields.keys())
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
+        fields = parse_fields(fields)
+        if fields is not None:
+            # Fields are built on first access, so the unselected ones are never built
+            self.only_fields = fields if self.only_fields is None else self.only_fields & fields
+
+    def resolve_related_pks(self, items):
+        """
+        Resolves the objects of primary keys referenced by the input items with single ``IN``
+        query per related field (the querysets already apply ``limit_choices_to``), instead of a
+        query per reference during validation
+
+        :param list items: Input data of the items
+        """
+        for field in self._writable_fields:
+            many = isinstance(field, rf_relations.ManyRelatedField)
+            relation = field.child_relation if many else field
+            if not isinstance(relation, PrimaryKeyRelatedField):
+                continue
+
+            pks = set()
+            for item in items:
+                if not isinstance(item, Mapping):
+                    continue
+                value = field.get_value(item)
+                if many:
+                    if isinstance(value, str) or not hasattr(value, '__iter__'):
+                        continue
+                    values = value
+                else:
+                    values = (value,)
+                for value in values:
+                    if value is not rf_fields.empty and value is not None:
+                        pks.add(relation.get_pk(value))
+            pks.discard(None)
+
+            relation.resolve(pks)
+
+    def to_internal_value(self, data):
+        # Items of the list serializer are resolved by the list serializer at once
+        if not isinstance(self.parent, ListSerializer) and isinstance(data, Mapping):
+            self.resolve_related_pks([data])
+
+        return super(Serializer, self).to_internal_value(data)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # Same as the rest framework's but defaults to the ListSerializer of this module
+        allow_empty = kwargs.pop('allow_empty', None)
+        list_kwargs = {'child': cls(*args, **kwargs)}
+        if allow_empty is not None:
+            list_kwargs['allow_empty'] = allow_empty
+        list_kwargs.update({key: value for key, value in kwargs.items()
+                            if key in rf_serializers.LIST_SERIALIZER_KWARGS})
+        meta = getattr(cls, 'Meta', None)
+        list_serializer_class = getattr(meta, 'list_serializer_class', ListSerializer)
+
+        return list_serializer_class(*args, **list_kwargs)
+
+    def get_fields(self):
+        """
+        Returns copies of the fields built once per class and field set, see ``cache_fields``
+        """
+        if self.cache_fields is not True:
+            return self.build_fields()
+
+        key = (self.__class__, self.only_fields)
+        template = _field_templates.get(key)
+        if template is None:
+            template = self.build_fields()
+            _cache_set(_field_templates, key, template)
+
+        return OrderedDict((name, _clone_field(field)) for name, field in template.items())
+
+    def build_fields(self):
+        """
+        Builds the fields of the serializer. Result is used as template for all the instances
+        of the class having the same field set.
+        """
+        if self.only_fields is None:
+            return super(Serializer, self).get_fields()
+
+        return OrderedDict((name, copy.deepcopy(field))
+                           for name, field in self._declared_fields.items()
+                           if name in self.only_fields)
+
+    @classmethod
+    def pruned_class(cls, fields):
+        """
+        Returns subclass of the serializer that builds only the given fields, so the unselected
+        declared fields aren't even copied on instantiation. Subclasses are cached per field set.
+
+        :param list,str fields: Field names as list or comma separated str
+        :return: Serializer class
+        """
+        only_fields = parse_fields(fields)
+        if only_fields is None:
+            return cls
+        if cls.only_fields is not None:
+            only_fields &= cls.only_fields
+
+        key = (cls, only_fields)
+        pruned = _pruned_classes.get(key)
+        if pruned is None:
+            pruned = type(cls)(cls.__name__, (cls,), {
+                '__module__': cls.__module__,
+                '__doc__': cls.__doc__,
+                'only_fields': only_fields,
+                # The class it's pruned from, e.g. to cache things per serializer class
+                '_unpruned_class': vars(cls).get('_unpruned_class', cls),
+            })
+            pruned._declared_fields = OrderedDict(
+                (name, field) for name, field in cls._declared_fields.items()
+                if name in only_fields
+            )
+            _cache_set(_pruned_classes, key, pruned)
+
+        return pruned
 
     @classmethod
     def subserializer_class(cls, only_fields: list = None):
+        key = (cls, tuple(only_fields) if only_fields is not None else None)
+        try:
+            return _subserializer_classes[key]
+        except KeyError:
+            pass
+
         class SubSerializer(cls):
             class Meta(cls.Meta):
                 fields = only_fields
                 exclude = None
 
+        _cache_set(_subserializer_classes, key, SubSerializer)
+
         return SubSerializer
 
 
@@ -44,17 +311,28 @@ class ModelSerializer(rf_serializers.ModelSerializer, Serializer):
     """
     Base serializer for model
     """
+    serializer_related_field = PrimaryKeyRelatedField
 
-    def __init__(self, *args, **kwargs):
-        super(ModelSerializer, self).__init__(*args, **kwargs)
+    def get_fields(self):
+        return Serializer.get_fields(self)
+
+    def build_fields(self):
+        fields = super(ModelSerializer, self).get_fields()
         meta = getattr(self, 'Meta', None)
 
         # Update the error messages specified under the Meta class for each fields
         for field_name, err_msgs in getattr(meta, 'error_messages', {}).items():
             try:
-                self.fields[field_name].error_messages.update(**err_msgs)
+                field = fields[field_name]
             except KeyError:
-                pass
+                continue
+            field.error_messages.update(**err_msgs)
+            # Copies of the field are built from its arguments, see _clone_field()
+            field._kwargs = dict(field._kwargs, error_messages=dict(
+                field._kwargs.get('error_messages') or {}, **err_msgs
+            ))
+
+        return fields
 
     @property
     def validated_data(self):
@@ -69,6 +347,13 @@ class ModelSerializer(rf_serializers.ModelSerializer, Serializer):
 
         return validated_data
 
+    def get_field_names(self, declared_fields, info):
+        field_names = super(ModelSerializer, self).get_field_names(declared_fields, info)
+        if self.only_fields is None:
+            return field_names
+
+        return [name for name in field_names if name in self.only_fields]
+
     def build_relational_field(self, field_name, relation_info):
         field_class, field_kwargs = super(ModelSerializer, self).build_relational_field(
             field_name, relation_info
@@ -101,3 +386,423 @@ class ModelSerializer(rf_serializers.ModelSerializer, Serializer):
             validated_data.pop(field, None)
 
         return super(ModelSerializer, self).update(instance, validated_data)
+
+
+def bulk_update(model, objs, fields, batch_size=None):
+    """
+    Updates given fields of the objects with an ``UPDATE`` query per batch, using
+    ``QuerySet.bulk_update()`` where available (Django >= 2.2)
+
+    :param model: Model class
+    :param list objs: Model instances to be updated
+    :param list fields: Names of the fields to be updated
+    :param int batch_size: Number of objects updated by single query
+    """
+    manager = model._default_manager
+    if hasattr(manager, 'bulk_update'):
+        return manager.bulk_update(objs, fields, batch_size=batch_size)
+
+    model_fields = [model._meta.get_field(name) for name in fields]
+    ops = connections[router.db_for_write(model)].ops
+    max_batch_size = max(ops.bulk_batch_size(['pk', 'pk'] + model_fields, objs), 1)
+    batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        manager.filter(pk__in=[obj.pk for obj in batch]).update(**{
+            field.attname: Case(*[When(pk=obj.pk, then=Value(getattr(obj, field.attname),
+                                                             output_field=field))
+                                  for obj in batch], output_field=field)
+            for field in model_fields
+        })
+
+
+class BulkListSerializer(ListSerializer):
+    """
+    List serializer writing the whole batch in single transaction with ``bulk_create()`` and
+    batched ``UPDATE`` queries instead of a query per item. Child serializer's
+    ``Meta.exclude_on_create``, ``Meta.exclude_on_update`` and ``Meta.autoset_owner`` options
+    are honored.
+
+    To be used by setting ``list_serializer_class = BulkListSerializer`` in ``Meta`` of the model
+    serializer. Number of rows written by single query can be set by ``Meta.bulk_batch_size``.
+
+    For update, instance must be the list of objects in the same order as the data items.
+
+    Values of the unique fields are checked for the whole batch, against the existing rows by a
+    query per field and against each other, see :meth:`validate_unique`.
+
+    .. note:: ``bulk_create()`` doesn't call ``save()`` nor sends the model signals and it sets
+        the primary keys only on the backends that return them, e.g. PostgreSQL with
+        Django >= 1.10. Items having many to many values are saved one by one as the relations
+        need primary key.
+    """
+    #: Default number of rows written by single query
+    batch_size = 1000
+
+    def get_batch_size(self):
+        return getattr(self.child.Meta, 'bulk_batch_size', self.batch_size)
+
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = html.parse_html_list(data)
+        unique_validators = self.get_unique_validators()
+
+        if self.instance is None:
+            instances = None
+            try:
+                ret = super().to_internal_value(data)
+            except rf_serializers.ValidationError as exc:
+                if not isinstance(exc.detail, list):
+                    raise
+                ret, errors = None, list(exc.detail)
+            else:
+                errors = [{} for __ in ret]
+        else:
+            instances = list(self.instance)
+            ret, errors = self._validate_instances(instances, data)
+
+        for index, item_errors in self.validate_unique(data, instances, unique_validators).items():
+            # Errors of the field's own validation come first
+            item_errors.update(errors[index])
+            errors[index] = item_errors
+
+        if any(errors):
+            raise rf_serializers.ValidationError(errors)
+
+        return ret
+
+    def _validate_instances(self, instances, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+        elif len(data) != len(instances):
+            message = 'Expected a list of %s items but got %s.' % (len(instances), len(data))
+        else:
+            message = None
+        if message is not None:
+            raise rf_serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+        if hasattr(self.child, 'resolve_related_pks'):
+            self.child.resolve_related_pks(data)
+
+        # Each item is validated against its own instance, e.g. for unique together validators
+        ret, errors = [], []
+        try:
+            for instance, item in zip(instances, data):
+                self.child.instance = instance
+                try:
+                    validated = self.child.run_validation(item)
+                except rf_serializers.ValidationError as exc:
+                    errors.append(exc.detail)
+                else:
+                    ret.append(validated)
+                    errors.append({})
+        finally:
+            self.child.instance = self.instance
+
+        return ret, errors
+
+    def get_unique_validators(self):
+        """
+        Returns ``(field, validator)`` of the unique fields of the child serializer, checked for
+        the whole batch by :meth:`validate_unique`. The validators are removed from the fields,
+        so they don't run a query per item.
+        """
+        try:
+            return self._unique_validators
+        except AttributeError:
+            pass
+
+        self._unique_validators = []
+        for field in self.child._writable_fields:
+            if isinstance(field, (rf_serializers.BaseSerializer, rf_relations.RelatedField,
+                                  rf_relations.ManyRelatedField)) or len(field.source_attrs) != 1:
+                continue
+            validators = []
+            for validator in field.validators:
+                if isinstance(validator, UniqueValidator) and \
+                        getattr(validator, 'lookup', 'exact') == 'exact':
+                    self._unique_validators.append((field, validator))
+                else:
+                    validators.append(validator)
+            field.validators = validators
+
+        return self._unique_validators
+
+    def validate_unique(self, data, instances, validators):
+        """
+        Returns the errors of the items whose values of unique fields exist in other rows or are
+        repeated in the batch. Existing values are looked up by single ``IN`` query per field
+        (split by the number of parameters the backend supports) instead of a query per item.
+
+        :param list data: Input data of the items
+        :param list instances: Instances updated by the items, None on create
+        :param list validators: ``(field, validator)`` of the unique fields
+        :return dict: Errors by index of the item
+        """
+        errors = {}
+        if not isinstance(data, list):
+            return errors
+
+        for field, validator in validators:
+            values = OrderedDict()
+            for index, item in enumerate(data):
+                if not isinstance(item, Mapping) or field.field_name not in item:
+                    continue
+                try:
+                    # Invalid values are reported by the validation of the item
+                    value = field.run_validation(item[field.field_name])
+                    hash(value)
+                except (rf_serializers.ValidationError, DjangoValidationError, TypeError):
+                    continue
+                if value is not None:
+                    values[index] = value
+
+            queryset, name = validator.queryset, field.source_attrs[0]
+            unique_values = list(set(values.values()))
+            batch_size = max(connections[queryset.db].ops.bulk_batch_size(['pk'], unique_values),
+                             1)
+            existing = {}
+            for start in range(0, len(unique_values), batch_size):
+                existing.update(queryset.filter(**{
+                    '%s__in' % name: unique_values[start:start + batch_size]
+                }).values_list(name, 'pk'))
+
+            seen = set()
+            for index, value in values.items():
+                pk = existing.get(value)
+                instance = instances[index] if instances is not None else None
+                if value in seen or (pk is not None and (instance is None or pk != instance.pk)):
+                    errors.setdefault(index, {})[field.field_name] = [validator.message]
+                seen.add(value)
+
+        return errors
+
+    def _split_many_to_many(self, attrs):
+        info = model_meta.get_field_info(self.child.Meta.model)
+        return {field_name: attrs.pop(field_name) for field_name, relation_info
+                in info.relations.items() if relation_info.to_many and field_name in attrs}
+
+    def get_owner(self):
+        """
+        Returns the user set as owner of the items by ``Meta.autoset_owner``, None if not set
+        """
+        meta = self.child.Meta
+        if getattr(meta.model, 'owner', None) and getattr(meta, 'autoset_owner', False) is True:
+            return self.context['request'].user
+        return None
+
+    def create(self, validated_data):
+        meta = self.child.Meta
+        model = meta.model
+        exclude_on_create = getattr(meta, 'exclude_on_create', [])
+        owner = self.get_owner()
+
+        objs, related = [], []
+        for attrs in validated_data:
+            rf_serializers.raise_errors_on_nested_writes('create', self.child, attrs)
+            attrs = {key: value for key, value in attrs.items() if key not in exclude_on_create}
+            if owner is not None:
+                attrs['owner'] = owner
+            many_to_many = self._split_many_to_many(attrs)
+            objs.append(model(**attrs))
+            related.append(many_to_many)
+
+        using = router.db_for_write(model)
+        bulk = [obj for obj, many_to_many in zip(objs, related) if not many_to_many]
+        # Older Django doesn't limit given batch size to what the backend supports
+        batch_size = min(self.get_batch_size(), max(
+            connections[using].ops.bulk_batch_size(model._meta.concrete_fields, bulk), 1
+        ))
+
+        with transaction.atomic(using=using):
+            model._default_manager.bulk_create(bulk, batch_size=batch_size)
+            for obj, many_to_many in zip(objs, related):
+                if many_to_many:
+                    obj.save()
+                    for field_name, value in many_to_many.items():
+                        getattr(obj, field_name).set(value)
+
+        # Bulk queries don't send the signals
+        cache.bump_version_on_commit(model, using)
+
+        return objs
+
+    def update(self, instance, validated_data):
+        meta = self.child.Meta
+        model = meta.model
+        exclude_on_update = getattr(meta, 'exclude_on_update', [])
+        owner = self.get_owner()
+        objs = list(instance)
+
+        fields, related = set(), []
+        for obj, attrs in zip(objs, validated_data):
+            rf_serializers.raise_errors_on_nested_writes('update', self.child, attrs)
+            # Same as the child serializer, owner is set unless excluded on update
+            if owner is not None:
+                attrs = dict(attrs, owner=owner)
+            attrs = {key: value for key, value in attrs.items() if key not in exclude_on_update}
+            related.append(self._split_many_to_many(attrs))
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+
+        # Same as save(), auto_now fields, e.g. Model.updated_at, are set to current time
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for obj in objs:
+                    setattr(obj, field.attname, now)
+                fields.add(field.name)
+
+        with transaction.atomic(using=router.db_for_write(model)):
+            bulk_update(model, objs, sorted(fields), batch_size=self.get_batch_size())
+            for obj, many_to_many in zip(objs, related):
+                for field_name, value in many_to_many.items():
+                    getattr(obj, field_name).set(value)
+
+        cache.bump_version_on_commit(model, router.db_for_write(model))
+
+        return objs
+
+
+#: Cached values plans by serializer class and field names, see get_values_plan()
+_values_plans = {}
+
+
+class ValuesPlan(object):
+    """
+    Representation of serializer fields from the rows of ``QuerySet.values_list()``, producing
+    the same output as the serializer does from model instances
+
+    :param list columns: Columns to be fetched
+    :param list fields: List of ``(field name, row index, to_representation)``
+    """
+    __slots__ = ('columns', 'fields')
+
+    def __init__(self, columns, fields):
+        self.columns = columns
+        self.fields = fields
+
+    def to_representation(self, row):
+        ret = OrderedDict()
+        for name, index, to_representation in self.fields:
+            value = row[index]
+            # Same as the serializer, None is not passed to the field
+            ret[name] = None if value is None else to_representation(value)
+        return ret
+
+
+def _get_values_column(field, opts):
+    """
+    Returns the column and kind (``pk`` or ``value``) the field can be read from or None if the
+    field needs model instance
+    """
+    if (isinstance(field, (rf_serializers.BaseSerializer, rf_fields.SerializerMethodField,
+                           rf_fields.FileField, rf_fields.HiddenField,
+                           rf_relations.ManyRelatedField)) or
+            len(field.source_attrs) != 1):
+        return None
+
+    try:
+        model_field = opts.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        # Property or method of the model
+        return None
+    if not getattr(model_field, 'concrete', False) or model_field.many_to_many:
+        return None
+
+    if model_field.is_relation:
+        if not is_pk_only_field(field):
+            return None
+        return model_field.attname, 'pk'
+
+    if isinstance(field, rf_relations.RelatedField) or \
+            type(field).get_attribute is not rf_fields.Field.get_attribute:
+        return None
+
+    return model_field.attname, 'value'
+
+
+def get_values_plan(serializer):
+    """
+    Returns :class:`ValuesPlan` of the model serializer or None if any of its readable fields
+    needs model instance, e.g. nested serializers, method fields, model properties or the
+    serializer overrides ``to_representation()``.
+
+    :param ModelSerializer serializer: Serializer instance, fields selected by ``?fields=`` are \
+    considered
+    :return ValuesPlan:
+    """
+    fields = list(serializer._readable_fields)
+    key = (serializer.__class__, tuple(field.field_name for field in fields))
+
+    try:
+        columns = _values_plans[key]
+    except KeyError:
+        columns = None
+        if type(serializer).to_representation is rf_serializers.Serializer.to_representation:
+            opts = serializer.Meta.model._meta
+            columns = [_get_values_column(field, opts) for field in fields]
+            if None in columns:
+                columns = None
+        _cache_set(_values_plans, key, columns)
+
+    if columns is None:
+        return None
+
+    # Binding to the fields of this serializer instance as they may depend on its context
+    plan_fields = []
+    for index, (field, (column, kind)) in enumerate(zip(fields, columns)):
+        if kind == 'pk':
+            to_representation = field.pk_field.to_representation if field.pk_field else _identity
+        else:
+            to_representation = field.to_representation
+        plan_fields.append((field.field_name, index, to_representation))
+
+    return ValuesPlan([column for column, kind in columns], plan_fields)
+
+
+def _identity(value):
+    return value
+
+
+def get_source_fields(serializer_class, get_serializer=None):
+    """
+    Returns names of the model fields the readable fields of model serializer class are read
+    from, to be passed to ``QuerySet.only()``. Related objects, e.g. read by nested serializer
+    or dotted ``source``, are represented by their relation field. Result is cached per class.
+
+    :param serializer_class: Model serializer class, e.g. :meth:`Serializer.pruned_class` result
+    :param callable get_serializer: Returns instance of the class, it's called only when result \
+    isn't cached yet. Default to instantiating the class without arguments.
+    :return list: Field names, None if they can't be determined, e.g. the serializer has method \
+    fields, reads model properties or overrides ``to_representation()``
+    """
+    try:
+        return _source_fields[serializer_class]
+    except KeyError:
+        pass
+
+    names = None
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    if model is not None and \
+            serializer_class.to_representation is rf_serializers.Serializer.to_representation:
+        serializer = get_serializer() if get_serializer else serializer_class()
+        names = []
+        for field in serializer._readable_fields:
+            if isinstance(field, rf_fields.SerializerMethodField) or not field.source_attrs:
+                names = None
+                break
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                # Property or method of the model
+                names = None
+                break
+            # Reverse and many to many relations are fetched by primary key
+            if getattr(model_field, 'concrete', False) and not model_field.many_to_many:
+                names.append(model_field.name)
+
+    _cache_set(_source_fields, serializer_class, names)
+
+    return names
@@ -22,7 +22,7 @@ class APIClient(_APIClient):
                                               content_type=content_type, follow=follow, **extra)
         return self._fix_response(response)
 
-    def delete(self, path, data=None, formatc=None, content_type=None, follow=False, **extra):
+    def delete(self, path, data=None, format=None, content_type=None, follow=False, **extra):
         response = super(APIClient, self).delete(path, data=data, format=format,
                                                  content_type=content_type, follow=follow, **extra)
         return self._fix_response(response)
@@ -0,0 +1,201 @@
+"""
+======
+Timing
+======
+Per request timing of the processing phases. The timings are kept on the request object and
+reported in ``Server-Timing`` header by :class:`~drf_ext.core.middleware.HeadInfoMiddleware`.
+
+Phases are exclusive, i.e. time spent in a nested phase (and in database) isn't counted in the
+outer phase.
+
+* ``auth``: Authentication, permission and throttle checks
+* ``filter``: Filter backends
+* ``db``: Database queries
+* ``serialize``: Rest of the view, mostly serialization
+* ``render``: Rendering the response
+
+The executed queries are also collected in :class:`~drf_ext.core.queries.QueryStats` of the timer.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import connections
+
+from .queries import QueryStats
+
+#: Monotonic high resolution clock
+clock = time.perf_counter
+
+_local = threading.local()
+
+
+class RequestTimer(object):
+    """
+    Holds timing of a single request
+    """
+
+    def __init__(self):
+        self.start = clock()
+        self.end = None
+        self.phases = OrderedDict()
+        self.queries = QueryStats()
+        #: Name of the view and action handled the request
+        self.view_name = None
+        # Stack of [phase name, time spent in nested phases]
+        self._stack = []
+
+    def add(self, phase, duration):
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+        if self._stack:
+            self._stack[-1][1] += duration
+
+    def enter(self, phase):
+        self._stack.append([phase, 0.0])
+        return clock()
+
+    def exit(self, started):
+        elapsed = clock() - started
+        phase, nested = self._stack.pop()
+        self.add(phase, elapsed - nested)
+        # Nested time is already counted by nested phases themselves
+        if self._stack:
+            self._stack[-1][1] += nested
+
+    @property
+    def total(self):
+        return (self.end or clock()) - self.start
+
+    def server_timing(self):
+        """
+        Returns value for ``Server-Timing`` header
+        """
+        items = ['%s;dur=%.3f' % (phase, duration * 1000)
+                 for phase, duration in self.phases.items()]
+        items.append('total;dur=%.3f' % (self.total * 1000))
+
+        return ', '.join(items)
+
+
+def _http_request(request):
+    # Rest framework's Request proxies attributes of django's HttpRequest
+    return getattr(request, '_request', request)
+
+
+def get_timer(request):
+    """
+    Returns :class:`RequestTimer` of the request or None if timing isn't started
+    """
+    return getattr(_http_request(request), 'timer', None)
+
+
+def current_timer():
+    """
+    Returns :class:`RequestTimer` of the request being processed by current thread
+    """
+    return getattr(_local, 'timer', None)
+
+
+def start(request):
+    """
+    Starts timing the request and installs the database cursor hook
+    """
+    timer = RequestTimer()
+    _http_request(request).timer = timer
+    _local.timer = timer
+
+    for conn in connections.all():
+        install_cursor_hook(conn)
+
+    return timer
+
+
+def stop(request):
+    """
+    Stops timing the request
+
+    :return RequestTimer: Timer of the request or None if timing wasn't started
+    """
+    timer = get_timer(request)
+    _local.timer = None
+    if timer is not None and timer.end is None:
+        timer.end = clock()
+
+    return timer
+
+
+@contextmanager
+def timed(request, phase):
+    """
+    Context manager that counts the time spent in the block to given phase
+    """
+    timer = get_timer(request)
+    if timer is None:
+        yield
+        return
+
+    started = timer.enter(phase)
+    try:
+        yield
+    finally:
+        timer.exit(started)
+
+
+def record_query(sql, params, duration):
+    """
+    Called by the cursor hook for each executed query
+    """
+    timer = current_timer()
+    if timer is not None:
+        timer.add('db', duration)
+        timer.queries.add(sql, params, duration)
+
+
+class TimingCursor(object):
+    """
+    Thin proxy to the database cursor that reports the time spent in each query
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return self.cursor.__exit__(type, value, traceback)
+
+    def execute(self, sql, params=None):
+        started = clock()
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            record_query(sql, params, clock() - started)
+
+    def executemany(self, sql, param_list):
+        started = clock()
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            record_query(sql, param_list, clock() - started)
+
+
+def install_cursor_hook(conn):
+    """
+    Wraps the cursors created by the connection with :class:`TimingCursor`. Connections are per
+    thread so it's safe to be done on the connection object.
+    """
+    if getattr(conn, '_timing_hook_installed', False):
+        return
+
+    make_cursor, make_debug_cursor = conn.make_cursor, conn.make_debug_cursor
+    conn.make_cursor = lambda cursor: TimingCursor(make_cursor(cursor))
+    conn.make_debug_cursor = lambda cursor: TimingCursor(make_debug_cursor(cursor))
+    conn._timing_hook_installed = True
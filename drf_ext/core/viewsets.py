@@ -3,14 +3,161 @@
 ViewSet
 =======
 """
-from rest_framework import generics as rf_generics, viewsets as rf_viewsets
+import calendar
+import hashlib
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import router, transaction
+from django.db.models import Count, Max
+from django.db.models.constants import LOOKUP_SEP
+from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import generics as rf_generics, permissions as rf_permissions, \
+    serializers as rf_serializers, viewsets as rf_viewsets
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_extensions.mixins import NestedViewSetMixin as _NestedViewSetMixin
 
+from . import cache, errors as err, timing
+from .compiler import get_representation
+from .filters import OwnerFilterBackend
+from .planner import get_query_plan
+from .renderer import StreamingRendererMixin
+from .serializers import BulkListSerializer, get_source_fields, get_values_plan, parse_fields
+
+
+def iterate_queryset(queryset, chunk_size=2000):
+    """
+    Iterates over queryset using server side cursor (where database supports it) so the whole
+    result isn't loaded in memory
+
+    :param queryset: Queryset or any iterable
+    :param int chunk_size: Number of rows fetched from database at once
+    """
+    if not hasattr(queryset, 'iterator'):
+        return iter(queryset)
+
+    try:
+        return queryset.iterator(chunk_size=chunk_size)
+    except TypeError:
+        # Django < 2.0 doesn't accept chunk_size
+        return queryset.iterator()
+
 
 class GenericAPIView(rf_generics.GenericAPIView):
     """
     Extends feature to add parent_user object to request object
+
+    It also measures the time spent in each phase of the view, see :mod:`drf_ext.core.timing`
+
+    :param bool auto_prefetch: If True, relations read by the serializer are loaded by
+        ``select_related()``/``prefetch_related()`` for read requests, see
+        :mod:`drf_ext.core.planner`
     """
+    auto_prefetch = True
+
+    def dispatch(self, request, *args, **kwargs):
+        with timing.timed(request, 'serialize'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        timer = timing.get_timer(request)
+        if timer is not None:
+            timer.view_name = '%s.%s' % (self.__class__.__name__,
+                                         getattr(self, 'action', None) or request.method.lower())
+
+        with timing.timed(request, 'auth'):
+            super().initial(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        with timing.timed(self.request, 'filter'):
+            queryset = super().filter_queryset(queryset)
+
+        plan = self.get_query_plan() if hasattr(queryset, 'select_related') else None
+        if plan:
+            queryset = plan.apply(queryset)
+
+        only_fields = self.get_only_fields(queryset)
+        if only_fields is not None:
+            queryset = queryset.only(*only_fields)
+
+        return queryset
+
+    def get_query_plan(self):
+        """
+        Returns :class:`~drf_ext.core.planner.QueryPlan` of the serializer class to be applied to
+        the queryset of read requests, None if ``auto_prefetch`` is turned off
+        """
+        if self.auto_prefetch is not True or \
+                self.request.method not in rf_permissions.SAFE_METHODS:
+            return None
+
+        serializer_class = self.get_serializer_class()
+        # Plan is cached per class, so it's built by the request's serializer only if the class
+        # isn't pruned by the request after all
+        get_serializer = self.get_serializer
+        if getattr(serializer_class, 'only_fields', None) is None and \
+                parse_fields(self.request.GET.get('fields')):
+            get_serializer = None
+
+        return get_query_plan(serializer_class, get_serializer)
+
+    def get_only_fields(self, queryset):
+        """
+        Returns names of the model fields to be loaded by the read requests selecting the fields
+        by ``?fields=``, None to load all of them. Besides the fields the serializer reads, the
+        relations followed by ``select_related()``/``prefetch_related()``, the lookup field, the
+        ownership fields and the modification time field of conditional requests are loaded as
+        well, so none of them is fetched by a query per object.
+        """
+        if self.request.method not in rf_permissions.SAFE_METHODS or \
+                not parse_fields(self.request.GET.get('fields')) or \
+                not hasattr(queryset, 'only') or queryset.query.select_related is True:
+            return None
+
+        serializer_class = self.get_serializer_class()
+        # Field set of the class must not depend on the request as the result is cached per class
+        if getattr(serializer_class, 'only_fields', None) is None:
+            return None
+
+        names = get_source_fields(serializer_class, self.get_serializer)
+        if names is None:
+            return None
+
+        opts = queryset.model._meta
+        extra = list(queryset.query.select_related or ()) + [
+            getattr(lookup, 'prefetch_through', lookup).split(LOOKUP_SEP)[0]
+            for lookup in queryset._prefetch_related_lookups
+        ] + [field.split(LOOKUP_SEP)[0] for field in getattr(self, 'ownership_fields', ())
+             if field != '__staff__']
+        for name in (self.lookup_field, getattr(self, 'conditional_field', None)):
+            if name:
+                extra.append(name.split(LOOKUP_SEP)[0])
+        for name in extra:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if getattr(field, 'concrete', False) and not field.many_to_many:
+                names = names + [field.name]
+
+        return names
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        timer = timing.get_timer(request)
+        if timer is not None and hasattr(response, 'add_post_render_callback'):
+            render_start = timing.clock()
+            response.add_post_render_callback(
+                lambda r: timer.add('render', timing.clock() - render_start)
+            )
+
+        return response
 
 
 class GenericViewSet(GenericAPIView, rf_viewsets.GenericViewSet):
@@ -35,26 +182,28 @@ class GenericViewSet(GenericAPIView, rf_viewsets.GenericViewSet):
         ``create_serializer_class`` attribute name.
         Default to using `self.serializer_class`.
 
+        If the request selects the fields by ``?fields=``, the pruned subclass of the serializer
+        class is returned, see :meth:`drf_ext.core.serializers.Serializer.pruned_class`.
+
         You may want to override this if you need to provide different
         serializations depending on the incoming request.
         """
 
-        # Admin serializer
-        admin_serializer = self._get_admin_serializer()
-        if admin_serializer:
-            return admin_serializer
-
-        # Owner classes
-        owner_serializer_class = self._get_owner_serializer()
-        if owner_serializer_class:
-            return owner_serializer_class
+        serializer_class = (
+            # Admin serializer
+            self._get_admin_serializer() or
+            # Owner classes
+            self._get_owner_serializer() or
+            # Action serializer
+            getattr(self, '%s_serializer_class' % self.action, None) or
+            self.serializer_class
+        )
 
-        # Action serializer
-        serializer_class = getattr(self, '%s_serializer_class' % self.action, None)
-        if serializer_class:
-            return serializer_class
+        fields = self.request.GET.get('fields') if self.request is not None else None
+        if fields and hasattr(serializer_class, 'pruned_class'):
+            return serializer_class.pruned_class(fields)
 
-        return self.serializer_class
+        return serializer_class
 
     def _get_admin_serializer(self):
         if self.request.user.is_superuser:
@@ -62,15 +211,574 @@ class GenericViewSet(GenericAPIView, rf_viewsets.GenericViewSet):
 
     def _get_owner_serializer(self):
         owner_serializer_class = getattr(self, 'owner_%s_serializer_class' % self.action, None)
-        if owner_serializer_class:
+        # The object is set by the action once it's fetched, the serializer class is also asked
+        # while fetching it, e.g. by the query plan of get_object()
+        obj = getattr(self, 'object', None)
+        if owner_serializer_class and obj is not None:
             _u = self.request.user
-            result = any(_u == getattr(self.object, field) or _u.id == getattr(self.object, field)
+            result = any(_u == getattr(obj, field) or _u.id == getattr(obj, field)
                          for field in self.ownership_fields)
             if result is True:
                 return owner_serializer_class
 
 
-class ModelViewSet(rf_viewsets.ModelViewSet, GenericViewSet):
+class StreamingListMixin(object):
+    """
+    Streams the unpaginated list response using ``StreamingHttpResponse`` instead of building
+    whole list in memory.
+
+    Streaming is used only when the view sets ``stream_list = True``, the pagination is turned
+    off (i.e. :class:`~drf_ext.core.pagination.NoPagination`) and the negotiated renderer is a
+    streaming renderer, e.g. :class:`~drf_ext.core.renderer.JSONStreamRenderer`,
+    :class:`~drf_ext.core.renderer.NDJSONRenderer` or :class:`~drf_ext.core.renderer.CSVRenderer`.
+
+    :param bool stream_list: If True, list action will be streamed
+    :param int stream_chunk_size: Number of rows fetched from database at once
+    """
+    stream_list = False
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if self.stream_list is not True or not isinstance(renderer, StreamingRendererMixin):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginate_queryset(queryset) is not None:
+            return super().list(request, *args, **kwargs)
+
+        return self.get_streaming_response(queryset, renderer)
+
+    def get_streaming_response(self, queryset, renderer):
+        # Single serializer instance is enough to represent every row
+        to_representation = get_representation(self.get_serializer())
+        rows = (to_representation(obj)
+                for obj in iterate_queryset(queryset, self.stream_chunk_size))
+
+        content_type = self.request.accepted_media_type
+        if renderer.charset and 'charset' not in content_type:
+            content_type = '%s; charset=%s' % (content_type, renderer.charset)
+
+        return StreamingHttpResponse(
+            renderer.render_stream(rows, accepted_media_type=self.request.accepted_media_type,
+                                   renderer_context=self.get_renderer_context()),
+            content_type=content_type
+        )
+
+
+class ValuesReadMixin(object):
+    """
+    Read fast path that fetches only the needed columns with ``QuerySet.values_list()`` and
+    builds the output from the rows, skipping model instantiation and generic per field dispatch.
+
+    The output is identical to the serializer's. It falls back to the standard path when any
+    readable field needs model instance (see :func:`~drf_ext.core.serializers.get_values_plan`).
+    Retrieve also falls back when any permission class checks object permission as there is no
+    model instance to be checked.
+
+    :param bool values_read: If True, list and retrieve actions use the fast path
+    """
+    values_read = False
+
+    def _get_values_plan(self):
+        if self.values_read is not True:
+            return None
+        return get_values_plan(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        plan = self._get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values_list(*plan.columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([plan.to_representation(row) for row in page])
+
+        return Response([plan.to_representation(row) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = self._get_values_plan()
+        if plan is None or _has_object_permissions(self):
+            return super().retrieve(request, *args, **kwargs)
+
+        return Response(plan.to_representation(_get_object_values(self, plan.columns)))
+
+
+def _has_object_permissions(view):
+    return any(type(permission).has_object_permission is not
+               rf_permissions.BasePermission.has_object_permission
+               for permission in view.get_permissions())
+
+
+def _get_object_values(view, columns):
+    """
+    Returns the columns of the object of the view as tuple, without object permission checks
+    """
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    filter_kwargs = {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+    return rf_generics.get_object_or_404(
+        view.filter_queryset(view.get_queryset()).values_list(*columns), **filter_kwargs
+    )
+
+
+_etag_suffix_re = re.compile(r';(gzip|deflate)$')
+
+
+def parse_etags(value):
+    """
+    Returns the entity tags of ``If-Match`` or ``If-None-Match`` header value without quotes,
+    weak indicator and the suffix added by :class:`~drf_ext.core.middleware.CompressionMiddleware`
+
+    :param str value: Header value
+    :return set:
+    """
+    etags = set()
+    for etag in value.split(','):
+        etag = etag.strip()
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        etag = _etag_suffix_re.sub('', etag.strip('"'))
+        if etag:
+            etags.add(etag)
+
+    return etags
+
+
+def _make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def _timestamp(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+    return calendar.timegm(value.utctimetuple())
+
+
+class ConditionalMixin(object):
+    """
+    Conditional request support based on modification time of the rows, i.e.
+    :attr:`drf_ext.db.models.Model.updated_at` by default.
+
+    * Retrieve responds ``ETag`` and ``Last-Modified`` of the object.
+    * List responds them derived from the latest modification time and the count of the
+      filtered queryset, fetched by single aggregate query.
+    * Both respond ``304 Not Modified`` without serializing, if ``If-None-Match`` or
+      ``If-Modified-Since`` header matches. Responses vary by ``Authorization`` and ``Cookie``
+      headers, as the rows and the serializer may depend on the user.
+    * Update and destroy compare ``If-Match`` header with the version of the locked row and
+      fail with ``412 Precondition Failed`` if it has been modified meanwhile.
+
+    .. note:: Versions reflect the rows of the view's model only. Turn it on for the views those
+        representation doesn't include related objects changing on their own.
+
+    :param bool conditional: If True, conditional requests are supported
+    :param str conditional_field: Modification time field of the model
+    """
+    conditional = False
+    conditional_field = 'updated_at'
+
+    def get_object_etag(self, obj):
+        return _make_etag(obj._meta.label, obj.pk, getattr(obj, self.conditional_field))
+
+    def get_list_version(self, queryset):
+        """
+        Returns ETag and last modification time of the filtered queryset
+        """
+        result = queryset.aggregate(last_modified=Max(self.conditional_field),
+                                    count=Count('pk'))
+        serializer_class = self.get_serializer_class()
+        etag = _make_etag(queryset.model._meta.label, result['last_modified'], result['count'],
+                          self.request.GET.urlencode(),
+                          serializer_class.__module__ + '.' + serializer_class.__qualname__)
+
+        return etag, result['last_modified']
+
+    def get_not_modified_response(self, etag, last_modified):
+        """
+        Returns ``304 Not Modified`` response if the client has the current version else None
+        """
+        meta = self.request.META
+        if 'HTTP_IF_NONE_MATCH' in meta:
+            # If-Modified-Since is ignored when If-None-Match is present
+            etags = parse_etags(meta['HTTP_IF_NONE_MATCH'])
+            not_modified = '*' in etags or etag in etags
+        else:
+            if_modified_since = parse_http_date_safe(meta.get('HTTP_IF_MODIFIED_SINCE', ''))
+            not_modified = bool(if_modified_since and last_modified and
+                                _timestamp(last_modified) <= if_modified_since)
+
+        return HttpResponseNotModified() if not_modified else None
+
+    def get_object_version(self):
+        """
+        Returns ETag and last modification time of the object, fetching only the version unless
+        object permissions need the object
+        """
+        if _has_object_permissions(self):
+            instance = self.get_object()
+            return self.get_object_etag(instance), getattr(instance, self.conditional_field)
+
+        pk, last_modified = _get_object_values(self, ('pk', self.conditional_field))
+        model = self.get_queryset().model
+        return _make_etag(model._meta.label, pk, last_modified), last_modified
+
+    def set_version_headers(self, response, etag, last_modified):
+        response['ETag'] = '"%s"' % etag
+        if last_modified:
+            response['Last-Modified'] = http_date(_timestamp(last_modified))
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if self.conditional is not True:
+            return super().list(request, *args, **kwargs)
+
+        etag, last_modified = self.get_list_version(
+            self.filter_queryset(self.get_queryset())
+        )
+        response = self.get_not_modified_response(etag, last_modified) or \
+            super().list(request, *args, **kwargs)
+
+        return self.set_version_headers(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.conditional is not True:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = self.get_object_version()
+        # Response is built by the other mixins, e.g. read from the cache, unless not modified
+        response = self.get_not_modified_response(etag, last_modified) or \
+            super().retrieve(request, *args, **kwargs)
+
+        return self.set_version_headers(response, etag, last_modified)
+
+    def check_if_match(self, instance):
+        """
+        Raises ``PreconditionFailed`` if the version of the row doesn't match ``If-Match``
+        header. Must be called in a transaction as the row is locked until it's written.
+        """
+        etags = parse_etags(self.request.META['HTTP_IF_MATCH'])
+        if '*' in etags:
+            return
+
+        modified = self.get_queryset().model._default_manager.select_for_update().filter(
+            pk=instance.pk
+        ).values_list(self.conditional_field, flat=True).first()
+        if _make_etag(instance._meta.label, instance.pk, modified) not in etags:
+            raise err.PreconditionFailed(*err.m.PRECONDITION_FAILED)
+
+    def _with_if_match(self, instance, perform):
+        if self.conditional is not True or 'HTTP_IF_MATCH' not in self.request.META:
+            return perform()
+
+        with transaction.atomic(using=router.db_for_write(instance.__class__)):
+            self.check_if_match(instance)
+            return perform()
+
+    def perform_update(self, serializer):
+        self._with_if_match(serializer.instance,
+                            lambda: super(ConditionalMixin, self).perform_update(serializer))
+        self._updated_instance = serializer.instance
+
+    def perform_destroy(self, instance):
+        self._with_if_match(instance,
+                            lambda: super(ConditionalMixin, self).perform_destroy(instance))
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+
+        # Letting the client to chain the updates
+        instance = getattr(self, '_updated_instance', None)
+        if self.conditional is True and instance is not None:
+            self.set_version_headers(response, self.get_object_etag(instance),
+                                     getattr(instance, self.conditional_field))
+
+        return response
+
+
+class CacheResponseMixin(object):
+    """
+    Caches the data of list and retrieve responses, see :mod:`drf_ext.core.cache`.
+
+    Cache key consists of the viewset, action, URL kwargs, normalized query params, versions of
+    the models and the scope of the requesting user. Scope is the user unless ``cache_per_user``
+    is False, then it's the user only when the list is filtered by
+    :class:`~drf_ext.core.filters.OwnerFilterBackend`, when the object permission is checked or
+    when user specific serializer class is declared. Authentication, permission and throttle
+    checks run for the cached responses as well.
+
+    :param bool cache_responses: If True, responses are cached
+    :param int cache_timeout: Time in seconds the responses are cached for
+    :param tuple cache_dependencies: Other models those rows are included in the responses, e.g.
+        by nested serializers
+    :param bool cache_per_user: If False, responses not depending on the user are shared by all
+        users. Set it only if the responses don't depend on the user otherwise.
+    """
+    cache_responses = False
+    cache_timeout = 300
+    cache_dependencies = ()
+    cache_per_user = True
+
+    @classmethod
+    def register_cache_models(cls, model=None):
+        """
+        Connects the signals invalidating the cached responses on the changes of the model of the
+        queryset and ``cache_dependencies``, see :func:`drf_ext.core.cache.register`
+        """
+        if cls.cache_responses is not True:
+            return
+        if model is None:
+            if cls.queryset is None:
+                # Registered on the first cached request
+                return
+            model = cls.queryset.model
+
+        cache.register(model, *cls.cache_dependencies)
+
+    def get_cache_scope(self):
+        """
+        Returns the part of the cache key specific to the requesting user
+        """
+        user = self.request.user
+        if self.cache_per_user is not False:
+            return [user.pk]
+
+        scope = []
+
+        ownership_fields = getattr(self, 'ownership_fields', None)
+        if self.action == 'list':
+            if ownership_fields and getattr(self, 'skip_owner_filter', False) is not True and \
+                    any(issubclass(backend, OwnerFilterBackend)
+                        for backend in self.filter_backends):
+                if '__staff__' in ownership_fields and (user.is_staff or user.is_superuser):
+                    scope.append('staff')
+                else:
+                    scope.append(user.pk)
+        elif any(type(permission).has_object_permission is not
+                 rf_permissions.BasePermission.has_object_permission
+                 for permission in self.get_permissions()):
+            scope.append(user.pk)
+
+        if getattr(self, 'admin_serializer_class', None) and user.is_superuser:
+            scope.append('admin')
+        if getattr(self, 'owner_%s_serializer_class' % self.action, None):
+            scope.append(user.pk)
+
+        return scope
+
+    def get_cache_key(self):
+        models = (self.get_queryset().model,) + tuple(self.cache_dependencies)
+        self.register_cache_models(models[0])
+        view = '%s.%s' % (self.__class__.__module__, self.__class__.__name__)
+
+        return cache.make_key(view, self.action, sorted(self.kwargs.items()),
+                              sorted((key, sorted(values))
+                                     for key, values in self.request.GET.lists()),
+                              cache.get_versions(models), self.get_cache_scope())
+
+    def get_cached_response(self, get_response):
+        if self.cache_responses is not True:
+            return get_response()
+
+        key = self.get_cache_key()
+        data = cache.get_cache().get(key)
+        if data is not None:
+            return Response(data)
+
+        response = get_response()
+        if isinstance(response, Response) and response.status_code == 200:
+            cache.get_cache().set(key, response.data, self.cache_timeout)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(lambda: super(CacheResponseMixin, self).list(
+            request, *args, **kwargs
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(lambda: super(CacheResponseMixin, self).retrieve(
+            request, *args, **kwargs
+        ))
+
+
+class BulkMixin(object):
+    """
+    Opt-in bulk actions on the list endpoint, registered by :class:`~drf_ext.core.routers.Router`
+
+    * ``POST`` of a list of items creates them
+    * ``PATCH`` of a list of items, each having ``bulk_lookup_field``, partially updates them
+    * ``DELETE`` of a list of lookup values (or items having them) deletes them
+
+    Each request runs in single transaction and its items are written in batches by
+    :class:`~drf_ext.core.serializers.BulkListSerializer` (or ``Meta.list_serializer_class`` of
+    the serializer if it's a subclass of it). Nothing is written if any item is invalid, the
+    error lists the errors of each item, see :class:`~drf_ext.core.errors.ItemsValidationError`.
+
+    Permissions are checked once per request, e.g. ``DjangoModelPermissions``, and the object
+    permissions, e.g. ``IsOwnerPermissions``, against the objects loaded by single query.
+
+    :param tuple bulk_actions: Enabled bulk actions, any of ``create``, ``partial_update`` and
+        ``destroy``
+    :param str bulk_lookup_field: Field of the items identifying the objects to be updated or
+        deleted
+    :param int max_bulk_size: Maximum number of items in single request
+    """
+    bulk_actions = ()
+    bulk_lookup_field = 'id'
+    max_bulk_size = 1000
+
+    def create(self, request, *args, **kwargs):
+        if 'create' in self.bulk_actions and isinstance(request.data, list):
+            return self.bulk_create(request, *args, **kwargs)
+
+        return super().create(request, *args, **kwargs)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        """
+        Returns the bulk list serializer of the serializer class
+        """
+        serializer_class = self.get_serializer_class()
+        kwargs['context'] = self.get_serializer_context()
+        kwargs['child'] = serializer_class(partial=kwargs.get('partial', False),
+                                           context=kwargs['context'])
+
+        list_serializer_class = getattr(getattr(serializer_class, 'Meta', None),
+                                        'list_serializer_class', None)
+        if not isinstance(list_serializer_class, type) or \
+                not issubclass(list_serializer_class, BulkListSerializer):
+            list_serializer_class = BulkListSerializer
+
+        return list_serializer_class(*args, **kwargs)
+
+    def get_bulk_data(self):
+        """
+        Returns the items of the request, validating their number
+        """
+        data = self.request.data
+        if not isinstance(data, list):
+            message = rf_serializers.ListSerializer.default_error_messages['not_a_list']
+            raise rf_serializers.ValidationError(
+                {'detail': message.format(input_type=type(data).__name__)}
+            )
+        if len(data) > self.max_bulk_size:
+            detail, error_code = err.m.TOO_MANY_ITEMS
+            exc = rf_serializers.ValidationError(
+                {'detail': detail.format(limit=self.max_bulk_size)}
+            )
+            exc.error_code = error_code
+            raise exc
+
+        return data
+
+    def get_bulk_objects(self, items):
+        """
+        Returns the objects identified by the items, loaded by single query and locked till the
+        end of the transaction, in the order of the items. Object permissions are checked for
+        each of them.
+
+        :param list items: Lookup values
+        :raises ItemsValidationError: If any of the objects doesn't exist
+        """
+        field = self.bulk_lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            objects = {
+                str(getattr(obj, field)): obj
+                for obj in queryset.select_for_update().filter(**{field + '__in': items})
+            }
+        except (TypeError, ValueError):
+            objects = {}
+
+        errors = [{} if str(item) in objects else {field: [str(NotFound.default_detail)]}
+                  for item in items]
+        if any(errors):
+            raise err.ItemsValidationError(errors)
+
+        instances = [objects[str(item)] for item in items]
+        for obj in instances:
+            self.check_object_permissions(self.request, obj)
+
+        return instances
+
+    def get_bulk_lookups(self, data):
+        """
+        Returns lookup value of each item, items may be the values or dicts having them
+        """
+        field = self.bulk_lookup_field
+        lookups, errors = [], []
+        for item in data:
+            value = item.get(field) if isinstance(item, dict) else item
+            if value is None or isinstance(value, (dict, list)):
+                errors.append({field: [str(rf_serializers.Field.default_error_messages[
+                    'required'])]})
+            else:
+                errors.append({})
+            lookups.append(value)
+
+        if any(errors):
+            raise err.ItemsValidationError(errors)
+
+        return lookups
+
+    def validate_bulk(self, serializer):
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, dict):
+                raise rf_serializers.ValidationError(errors)
+            raise err.ItemsValidationError(list(errors))
+
+    def bulk_create(self, request, *args, **kwargs):
+        data = self.get_bulk_data()
+        with transaction.atomic(using=router.db_for_write(self.get_queryset().model)):
+            serializer = self.get_bulk_serializer(data=data)
+            self.validate_bulk(serializer)
+            self.perform_bulk_create(serializer)
+
+        return Response(serializer.data, status=201)
+
+    def perform_bulk_create(self, serializer):
+        serializer.save()
+
+    def bulk_partial_update(self, request, *args, **kwargs):
+        data = self.get_bulk_data()
+        with transaction.atomic(using=router.db_for_write(self.get_queryset().model)):
+            if not all(isinstance(item, dict) for item in data):
+                message = rf_serializers.Serializer.default_error_messages['invalid']
+                raise err.ItemsValidationError([
+                    {} if isinstance(item, dict) else {api_settings.NON_FIELD_ERRORS_KEY: [
+                        message.format(datatype=type(item).__name__)
+                    ]} for item in data
+                ])
+            instances = self.get_bulk_objects(self.get_bulk_lookups(data))
+            serializer = self.get_bulk_serializer(instances, data=data, partial=True)
+            self.validate_bulk(serializer)
+            self.perform_bulk_update(serializer)
+
+        return Response(serializer.data)
+
+    def perform_bulk_update(self, serializer):
+        serializer.save()
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        data = self.get_bulk_data()
+        with transaction.atomic(using=router.db_for_write(self.get_queryset().model)):
+            lookups = self.get_bulk_lookups(data)
+            instances = self.get_bulk_objects(lookups)
+            self.perform_bulk_destroy(instances)
+
+        return Response([{self.bulk_lookup_field: lookup} for lookup in lookups])
+
+    def perform_bulk_destroy(self, instances):
+        self.get_queryset().model._default_manager.filter(
+            pk__in=[obj.pk for obj in instances]
+        ).delete()
+
+
+class ModelViewSet(ConditionalMixin, CacheResponseMixin, StreamingListMixin, ValuesReadMixin,
+                   BulkMixin, rf_viewsets.ModelViewSet, GenericViewSet):
     """
     Base class for model view set
     """
@@ -82,27 +790,101 @@ class NestedViewSetMixin(_NestedViewSetMixin):
 
     * Method to get parent object
     * Add parent query dict to ``request.data``
+    * Add parent object to serializer context as ``parent`` once it's resolved, e.g. on create
+
+    Parent lookups and object are resolved once per request. The parent is fetched along with
+    the check of the whole ancestor chain in a single query, e.g. the book of
+    ``/authors/1/books/2/chapters`` is fetched only if it belongs to the author.
+
+    :param bool strict_parents: If True, listing under a missing ancestor chain responds with
+        not found instead of an empty list. The chain is checked by an ``exists()`` query.
     """
+    strict_parents = False
 
     def create(self, request, *args, **kwargs):
         self.get_parent_object()
-        request.data.update(**self.get_parents_query_dict())
+        parents_query_dict = self.get_parents_query_dict()
+        # List payload of bulk create, see BulkMixin. Invalid items are left to the serializer.
+        for item in request.data if isinstance(request.data, list) else [request.data]:
+            if isinstance(item, dict):
+                item.update(**parents_query_dict)
 
         return super().create(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs):
+        if self.strict_parents is True and not self.parents_exist():
+            raise Http404
+
+        return super().list(request, *args, **kwargs)
+
+    def get_parents_query_dict(self):
+        try:
+            return self._parents_query_dict
+        except AttributeError:
+            self._parents_query_dict = super().get_parents_query_dict()
+            return self._parents_query_dict
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        parent_object = getattr(self, '_parent_object', None)
+        if parent_object is not None:
+            context['parent'] = parent_object
+
+        return context
+
+    def get_parents_queryset(self):
+        """
+        Returns queryset of the immediate parent filtered by the whole ancestor chain, None if
+        view isn't nested
+        """
+        parents_query_dict = self.get_parents_query_dict()
+        if not parents_query_dict:
+            return None
+
+        # Immediate parent is the one related to the model directly, the lookups of the others
+        # go through it
+        parent_object_name = min(parents_query_dict, key=lambda name: name.count(LOOKUP_SEP))
+        parent_model = self.get_queryset().model._meta.get_field(parent_object_name).related_model
+
+        filters = {'pk': parents_query_dict[parent_object_name]}
+        prefix = parent_object_name + LOOKUP_SEP
+        for name, value in parents_query_dict.items():
+            if name.startswith(prefix):
+                filters[name[len(prefix):]] = value
+
+        return parent_model._default_manager.filter(**filters)
+
+    def parents_exist(self):
+        """
+        Returns True if the ancestor chain exists, without fetching the parent
+        """
+        if getattr(self, '_parent_object', None) is not None:
+            return True
+
+        try:
+            queryset = self.get_parents_queryset()
+            return queryset is None or queryset.exists()
+        except (ValueError, TypeError):
+            return False
+
     def get_parent_object(self):
         """
         Checks the object's parent object permission and returns it
         """
-        # Getting related field name
-        parent_object_name = list(self.get_parents_query_dict().keys())[:1][0]
-        # Getting parent model
-        parent_model = self.get_queryset().model._meta.get_field(parent_object_name).rel.to
-        # Getting parent object
-        parent_object = parent_model.objects.get(
-            id=self.get_parents_query_dict().get(parent_object_name)
-        )
+        parent_object = getattr(self, '_parent_object', None)
+        if parent_object is None:
+            try:
+                queryset = self.get_parents_queryset()
+                if queryset is None:
+                    return None
+                # Lookups spanning multi valued relations may match the parent more than once
+                parent_object = next(iter(queryset[:1]), None)
+            except (ValueError, TypeError):
+                parent_object = None
+            if parent_object is None:
+                raise Http404
 
-        self.check_object_permissions(self.request, parent_object)
+            self.check_object_permissions(self.request, parent_object)
+            self._parent_object = parent_object
 
         return parent_object
@@ -10,7 +10,8 @@ except ImportError:
 me = 'Abhinav Kotak'
 memail = 'in.abhi9@gmail.com'
 
-packages = ['drf_ext', 'drf_ext.db', 'drf_ext.core']
+packages = ['drf_ext', 'drf_ext.db', 'drf_ext.core', 'drf_ext.core.management',
+            'drf_ext.core.management.commands']
 install_requires = open('requirements.txt', 'r').readlines()
 
 setup(
@@ -0,0 +1,38 @@
+"""
+Settings of the test suite, run from the repository root by::
+
+    python -m django test --settings=tests.settings
+"""
+SECRET_KEY = 'drf-ext-tests'
+
+INSTALLED_APPS = [
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'tests',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+MIDDLEWARE_CLASSES = []
+ROOT_URLCONF = 'tests.urls'
+ALLOWED_HOSTS = ['*']
+USE_TZ = True
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['drf_ext.core.renderer.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': [],
+}
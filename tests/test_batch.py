@@ -0,0 +1,107 @@
+import threading
+
+from django.test import TransactionTestCase
+from mock import patch
+
+from drf_ext.core.batch import BatchViewSet
+from drf_ext.core.tests import APIClient, TestCase
+
+from .models import Book
+
+
+class BatchTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = Book.objects.create(title='book')
+
+    def test_references(self):
+        response = self.client.post('/batch', [
+            {'method': 'post', 'path': '/books', 'body': {'title': 'new'}, 'name': 'new'},
+            {'path': '/books/{result=new:$.id}', 'name': 'get'},
+            {'method': 'patch', 'path': '/books/%s' % self.book.pk,
+             'body': {'title': 'copy of {result=get:$.title}', 'author': '{result=get:$.author}'}},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+
+        created, retrieved, updated = response.data
+        self.assertEqual(created['status_code'], 201)
+        self.assertEqual(retrieved, {'status_code': 200, 'data': created['data']})
+        self.assertEqual(updated['status_code'], 200)
+        self.assertEqual(updated['data']['title'], 'copy of new')
+        # Single reference is replaced by the value as is
+        self.assertIsNone(updated['data']['author'])
+
+    def test_failed_reference(self):
+        response = self.client.post('/batch', [
+            {'path': '/books/0', 'name': 'missing'},
+            {'path': '/books/{result=missing:$.id}', 'name': 'dependent'},
+            {'method': 'delete', 'path': '/books/{result=dependent:$.id}'},
+            {'path': '/books/{result=unknown:$.id}'},
+            {'path': '/books/%s' % self.book.pk},
+        ], format='json')
+
+        self.assertEqual([result['status_code'] for result in response.data],
+                         [404, 424, 424, 400, 200])
+        self.assertTrue(Book.objects.exists())
+
+    def test_headers(self):
+        # Conditional headers of the batch request don't apply to the sub-requests
+        response = self.client.post('/batch', [{'path': '/books/%s' % self.book.pk}],
+                                    format='json', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['status_code'], 200)
+
+        requests = []
+
+        def get_sub_request(view, *args):
+            requests.append(get_sub_request.original(view, *args))
+            return requests[-1]
+
+        get_sub_request.original = BatchViewSet.get_sub_request
+        with patch.object(BatchViewSet, 'get_sub_request', get_sub_request):
+            self.client.post('/batch', [{'path': '/books'}], format='json',
+                             HTTP_IF_NONE_MATCH='*', HTTP_ACCEPT='application/json, text/csv')
+        self.assertNotIn('HTTP_IF_NONE_MATCH', requests[0].META)
+        self.assertEqual(requests[0].META['HTTP_ACCEPT'], 'application/json')
+
+    def test_streaming(self):
+        response = self.client.post('/batch', [{'path': '/book-stream'}], format='json')
+        self.assertEqual(response.data[0]['status_code'], 406)
+
+        # Not streamed when retrieved
+        response = self.client.post('/batch', [{'path': '/book-stream/%s' % self.book.pk}],
+                                    format='json')
+        self.assertEqual(response.data[0]['status_code'], 200)
+
+
+class ConcurrentBatchTest(TransactionTestCase):
+    client_class = APIClient
+
+    def test_groups(self):
+        book = Book.objects.create(title='book')
+        threads = {}
+
+        def run_item(view, item, named):
+            threads[item['path']] = threading.current_thread()
+            return run_item.original(view, item, named)
+
+        run_item.original = BatchViewSet.run_item
+        with patch.object(BatchViewSet, 'run_item', run_item):
+            response = self.client.post('/batch', [
+                {'path': '/books/%s' % book.pk, 'name': 'book'},
+                {'path': '/books?id=1'},
+                # Refers to the result of the group
+                {'path': '/books/{result=book:$.id}?id=2'},
+                {'method': 'post', 'path': '/books', 'body': {'title': 'new'}},
+                {'path': '/books?id=3'},
+                {'path': '/books?id=4'},
+            ], format='json')
+
+        self.assertEqual([result['status_code'] for result in response.data],
+                         [200, 200, 200, 201, 200, 200])
+        main = threading.current_thread()
+        concurrent = {path for path, thread in threads.items() if thread is not main}
+        self.assertEqual(concurrent, {'/books/%s' % book.pk, '/books?id=1',
+                                      '/books?id=3', '/books?id=4'})
+        # The books listed after the write see it
+        self.assertEqual(len(response.data[5]['data']), 2)
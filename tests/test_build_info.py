@@ -0,0 +1,39 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.test import override_settings
+from mock import patch
+
+from drf_ext.core import build_info
+from drf_ext.core.management.commands import write_build_info
+from drf_ext.core.tests import TestCase
+
+
+class BuildInfoTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        build_info.get_build_info.cache_clear()
+        self.addCleanup(build_info.get_build_info.cache_clear)
+
+    def test_stamp_file(self):
+        path = os.path.join(self.directory, 'build_info.json')
+        with override_settings(DRF_EXT_BUILD_INFO_FILE=path):
+            write_build_info.Command(stdout=StringIO()).handle(branch='master', commit='abc123',
+                                                               output=None)
+
+            with patch('subprocess.Popen', side_effect=AssertionError('git is run')):
+                self.assertEqual(build_info.get_build_info(),
+                                 {'branch': 'master', 'commit': 'abc123'})
+
+    def test_git_dir(self):
+        with open(os.path.join(self.directory, 'HEAD'), 'w') as f:
+            f.write('ref: refs/heads/release\n')
+        with open(os.path.join(self.directory, 'packed-refs'), 'w') as f:
+            f.write('# pack-refs with: peeled\ndef456 refs/heads/release\n')
+
+        self.assertEqual(build_info.read_git_dir(self.directory),
+                         {'branch': 'release', 'commit': 'def456'})
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import Group, Permission, User
+from mock import patch
+
+from drf_ext.core import cache, serializers, viewsets
+from drf_ext.core.tests import TestCase
+
+
+class ResponseCacheTest(TestCase):
+    class GroupSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Group
+            fields = ('id', 'name')
+
+    class GroupViewSet(viewsets.ModelViewSet):
+        queryset = Group.objects.all()
+        permission_classes = ()
+        cache_responses = True
+        cache_dependencies = (User,)
+
+    GroupViewSet.serializer_class = GroupSerializer
+
+    def test_registered_models(self):
+        self.GroupViewSet.register_cache_models()
+        group = Group.objects.create(name='group')
+        user = User.objects.create(username='user')
+
+        with patch.object(cache, 'bump_version_on_commit') as bump:
+            group.save()
+            user.groups.add(group)
+            Permission.objects.first().save()
+
+        bumped = {call[0][0] for call in bump.call_args_list}
+        self.assertEqual(bumped, {Group, User, User.groups.through})
+
+    def get_scope(self, view_class, user):
+        view = view_class(action='list', request=SimpleNamespace(user=user), kwargs={})
+        return view.get_cache_scope()
+
+    def test_scope(self):
+        first, second = User.objects.create(username='a'), User.objects.create(username='b')
+        self.assertNotEqual(self.get_scope(self.GroupViewSet, first),
+                            self.get_scope(self.GroupViewSet, second))
+
+        shared = type('GroupViewSet', (self.GroupViewSet,), {'cache_per_user': False})
+        self.assertEqual(self.get_scope(shared, first), self.get_scope(shared, second))
@@ -0,0 +1,140 @@
+import random
+
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from mock import patch
+from rest_framework import serializers as rf_serializers
+
+from drf_ext.core import compiler, serializers
+from drf_ext.core.tests import TestCase
+
+from .models import Author, Book
+
+
+class _ContentTypeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ContentType
+        fields = ('id', 'app_label', 'model')
+
+
+class _PermissionSerializer(serializers.ModelSerializer):
+    app_label = rf_serializers.CharField(source='content_type.app_label')
+    label = rf_serializers.SerializerMethodField()
+
+    class Meta:
+        model = Permission
+        fields = ('id', 'name', 'codename', 'content_type', 'app_label', 'label')
+
+    def get_label(self, obj):
+        return '%s.%s' % (obj.content_type.app_label, obj.codename)
+
+
+class _NestedPermissionSerializer(_PermissionSerializer):
+    content_type = _ContentTypeSerializer()
+
+
+class CompiledRepresentationTest(TestCase):
+    def get_compiled_class(self, serializer_class):
+        return type(serializer_class.__name__, (serializer_class,), {
+            'Meta': type('Meta', (serializer_class.Meta,), {'compile_representation': True})
+        })
+
+    def assertCompiledEqual(self, serializer_class):
+        compiled_class = self.get_compiled_class(serializer_class)
+        compiled = compiler.compile_representation(compiled_class())
+        self.assertFalse(hasattr(compiled, '__self__'), 'Serializer is not compiled')
+
+        permissions = Permission.objects.select_related('content_type').order_by('pk')[:20]
+        self.assertTrue(permissions)
+        for instance in permissions:
+            self.assertEqual(compiled(instance), serializer_class().to_representation(instance))
+        self.assertEqual(compiled_class(permissions, many=True).data,
+                         serializer_class(permissions, many=True).data)
+
+    def test_fields(self):
+        # Plain, foreign key, dotted source and method fields
+        self.assertCompiledEqual(_PermissionSerializer)
+
+    def test_nested(self):
+        self.assertCompiledEqual(_NestedPermissionSerializer)
+
+    def test_many_related(self):
+        serializer_class = type('UserSerializer', (serializers.ModelSerializer,), {
+            'Meta': type('Meta', (), {'model': User, 'fields': ('id', 'username', 'groups')})
+        })
+        user = User.objects.create(username='user')
+        user.groups.add(Group.objects.create(name='group'))
+        compiled = compiler.compile_representation(self.get_compiled_class(serializer_class)())
+        self.assertEqual(compiled(user), serializer_class().to_representation(user))
+
+
+class _AuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ('id', 'name')
+
+
+class _CompiledAuthorSerializer(_AuthorSerializer):
+    class Meta(_AuthorSerializer.Meta):
+        compile_representation = True
+
+
+#: Declared fields of each kind, by name
+_book_fields = {
+    'author_name': lambda: rf_serializers.CharField(source='author.name'),
+    'owner_username': lambda: rf_serializers.CharField(source='owner.username'),
+    'label': lambda: rf_serializers.SerializerMethodField(),
+    'author_detail': lambda: _AuthorSerializer(source='author'),
+    'compiled_author': lambda: _CompiledAuthorSerializer(source='author'),
+    # Not an attribute of the book, skipped
+    'isbn': lambda: rf_serializers.CharField(read_only=True),
+}
+#: Model fields, plain, foreign key and the nullable ones
+_book_model_fields = ('id', 'title', 'created_at', 'author', 'owner')
+
+
+def _get_book_serializer_class(field_names, compiled):
+    attrs = {name: _book_fields[name]() for name in field_names if name in _book_fields}
+    attrs['get_label'] = lambda self, obj: obj.title.upper()
+    attrs['Meta'] = type('Meta', (), {'model': Book, 'fields': field_names,
+                                      'compile_representation': compiled})
+    return type('BookSerializer', (serializers.ModelSerializer,), attrs)
+
+
+class CompiledBookTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create(username='owner')
+        author = Author.objects.create(name='author')
+        # Every combination of the nullable relations
+        Book.objects.bulk_create([
+            Book(title=title, author=book_author, owner=owner)
+            for title in ('', 'book') for book_author in (None, author) for owner in (None, user)
+        ])
+        self.books = list(Book.objects.select_related('author', 'owner').order_by('pk'))
+
+    def test_random_fields(self):
+        rng = random.Random(0)
+        names = list(_book_model_fields) + list(_book_fields)
+        for __ in range(50):
+            field_names = tuple(rng.sample(names, rng.randint(1, len(names))))
+            stock = _get_book_serializer_class(field_names, False)
+            compiled = _get_book_serializer_class(field_names, True)
+
+            representation = compiler.compile_representation(compiled())
+            self.assertFalse(hasattr(representation, '__self__'), field_names)
+            for book in self.books:
+                self.assertEqual(representation(book), stock().to_representation(book),
+                                 field_names)
+            self.assertEqual(compiled(self.books, many=True).data,
+                             stock(self.books, many=True).data, field_names)
+
+    def test_nested_opt_in(self):
+        serializer_class = _get_book_serializer_class(('id', 'author_detail', 'compiled_author'),
+                                                      True)
+        with patch.dict(compiler._builders, clear=True), \
+                patch.object(compiler, '_compile', wraps=compiler._compile) as compile_:
+            compiler.compile_representation(serializer_class())
+
+        self.assertEqual([call[0][0] for call in compile_.call_args_list],
+                         [serializer_class, _CompiledAuthorSerializer])
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from drf_ext.core import helper
+from drf_ext.core.downloads import DownloadError, Downloader
+from drf_ext.core.tests import TestCase
+
+
+class _DownloadServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _DownloadHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server_address[1]
+
+
+class _DownloadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(0.05)
+            if self.path.startswith('/missing'):
+                self.send_error(404)
+                return
+            content = self.path.encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloaderTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = _DownloadServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_download_many(self):
+        urls = ['%s/file/%s' % (self.server.url, i) for i in range(12)]
+        urls.append(self.server.url + '/missing')
+
+        with Downloader(max_workers=4, retries=0) as downloader:
+            results = {result.url: result for result in downloader.download_many(urls)}
+
+        self.assertEqual(set(results), set(urls))
+        self.assertTrue(1 < self.server.max_active <= 4, self.server.max_active)
+
+        error = results.pop(self.server.url + '/missing').error
+        self.assertIsInstance(error, DownloadError)
+        self.assertEqual(error.status_code, 404)
+        for url, result in results.items():
+            self.assertIsNone(result.error)
+            with open(result.file.name, 'rb') as f:
+                self.assertEqual(f.read(), url[len(self.server.url):].encode())
+            os.unlink(result.file.name)
+
+    def test_close(self):
+        urls = ('%s/file/%s' % (self.server.url, i) for i in range(100))
+
+        with Downloader(max_workers=2, retries=0, to_memory=True) as downloader:
+            results = downloader.download_many(urls)
+            next(results)
+            results.close()
+
+        # Only the submission window is downloaded
+        self.assertLessEqual(self.server.requests, 4)
+        self.assertEqual(len(list(urls)), 96)
+
+    def test_download_file(self):
+        f = helper.download_file(self.server.url + '/file', retries=0)
+        self.addCleanup(os.unlink, f.name)
+        with open(f.name, 'rb') as data:
+            self.assertEqual(data.read(), b'/file')
+
+        with self.assertRaises(DownloadError):
+            helper.download_file(self.server.url + '/missing', retries=0)
@@ -0,0 +1,67 @@
+import multiprocessing
+import tempfile
+import timeit
+
+from django.test import override_settings
+from mock import patch
+
+from drf_ext.core import metrics
+from drf_ext.core.tests import TestCase
+
+
+def _observe_requests(count):
+    for __ in range(count):
+        metrics.observe_request('UserViewSet', 'list', 'GET', 200, 0.02, size=512)
+    metrics.observe_request('UserViewSet', 'create', 'POST', 400, 0.2, size=100)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(DRF_EXT_METRICS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The store of this process is created in the directory
+        store_patcher = patch.object(metrics, '_store', None)
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+
+    def test_processes(self):
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_observe_requests, args=(count,))
+                     for count in (10, 20, 30)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        _observe_requests(5)
+
+        samples = dict(line.rsplit(' ', 1) for line in metrics.generate_latest().splitlines()
+                       if not line.startswith('#'))
+        labels = 'view="UserViewSet",action="list"'
+        self.assertEqual(samples['drf_ext_http_requests_total{%s,method="GET",status="200"}'
+                                 % labels], '65.0')
+        self.assertEqual(samples['drf_ext_http_requests_total{view="UserViewSet",'
+                                 'action="create",method="POST",status="400"}'], '4.0')
+        self.assertEqual(samples['drf_ext_http_request_duration_seconds_count{%s}' % labels],
+                         '65.0')
+        self.assertEqual(samples['drf_ext_http_request_duration_seconds_bucket{%s,le="0.01"}'
+                                 % labels], '0.0')
+        self.assertEqual(samples['drf_ext_http_request_duration_seconds_bucket{%s,le="0.025"}'
+                                 % labels], '65.0')
+        self.assertEqual(samples['drf_ext_http_response_size_bytes_sum{%s}' % labels],
+                         repr(65 * 512.0))
+
+    def test_overhead(self):
+        # Recording is on the path of every request, it's kept to a few dict lookups and array
+        # writes. The bound is loose enough for slow machines, it catches a regression to
+        # per-call key building or file I/O.
+        metrics.observe_request('UserViewSet', 'list', 'GET', 200, 0.02, size=512)
+        timer = timeit.Timer(
+            lambda: metrics.observe_request('UserViewSet', 'list', 'GET', 200, 0.02, size=512)
+        )
+        per_call = min(timer.repeat(repeat=5, number=1000)) / 1000
+        self.assertLess(per_call, 50e-6)
@@ -0,0 +1,225 @@
+import datetime
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+from mock import patch
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from drf_ext.core import cache, pagination
+from drf_ext.core.tests import TestCase
+
+from .models import Book
+
+factory = APIRequestFactory()
+
+
+def paginate(paginator, queryset, **params):
+    request = Request(factory.get('/books', params))
+    results = paginator.paginate_queryset(queryset, request)
+    return results, paginator.get_paginated_response(results).data
+
+
+class PageNumberPaginationTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        default_cache.clear()
+        Book.objects.bulk_create([Book(title='book %s' % i) for i in range(25)])
+        self.queryset = Book.objects.order_by('pk')
+
+    def get_paginator(self, strategy):
+        return type('Pagination', (pagination.PageNumberPagination,), {
+            'count_strategy': strategy, 'page_size': 10
+        })()
+
+    def test_exact(self):
+        results, data = paginate(self.get_paginator('exact'), self.queryset, page=3)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(data['count'], 25)
+        self.assertNotIn('count_exact', data)
+        self.assertIsNone(data['next'])
+        self.assertIn('page=2', data['previous'])
+
+    def test_cached(self):
+        _, data = paginate(self.get_paginator('cached'), self.queryset)
+        self.assertEqual((data['count'], data['count_exact']), (25, True))
+
+        Book.objects.create(title='uncounted')
+        _, data = paginate(self.get_paginator('cached'), self.queryset)
+        self.assertEqual((data['count'], data['count_exact']), (25, False))
+        # Filters make another query
+        _, data = paginate(self.get_paginator('cached'), self.queryset.filter(pk__gt=5))
+        self.assertEqual((data['count'], data['count_exact']), (21, True))
+
+        cache.bump_version(Book)
+        _, data = paginate(self.get_paginator('cached'), self.queryset)
+        self.assertEqual((data['count'], data['count_exact']), (26, True))
+
+    def test_estimated(self):
+        # Only PostgreSQL estimates, others are counted exactly
+        _, data = paginate(self.get_paginator('estimated'), self.queryset)
+        self.assertEqual((data['count'], data['count_exact']), (25, True))
+
+        with patch.object(pagination, 'estimate_count', return_value=5000):
+            results, data = paginate(self.get_paginator('estimated'), self.queryset, page=3)
+            self.assertEqual((data['count'], data['count_exact']), (5000, False))
+            # Last page is found by the objects, not the estimation
+            self.assertEqual(len(results), 5)
+            self.assertIsNone(data['next'])
+            self.assertIn('page=2', data['previous'])
+
+            results, data = paginate(self.get_paginator('estimated'), self.queryset,
+                                     page='last')
+            self.assertEqual((data['count'], data['count_exact']), (25, True))
+            self.assertEqual(len(results), 5)
+
+        with patch.object(pagination, 'estimate_count', return_value=10):
+            _, data = paginate(self.get_paginator('estimated'), self.queryset)
+            self.assertEqual((data['count'], data['count_exact']), (25, True))
+
+    def test_last_cached(self):
+        paginate(self.get_paginator('cached'), self.queryset)
+        Book.objects.bulk_create([Book(title='uncounted') for _ in range(10)])
+
+        results, data = paginate(self.get_paginator('cached'), self.queryset, page='last')
+        self.assertEqual((data['count'], data['count_exact']), (35, True))
+        self.assertEqual(len(results), 5)
+        self.assertIsNone(data['next'])
+
+    def test_previous_page(self):
+        paginator = pagination.Paginator(self.queryset, 10, get_count=lambda qs: (15, False))
+        page = paginator.page(3)
+        self.assertEqual(page.previous_page_number(), 2)
+        self.assertFalse(page.has_next())
+        with self.assertRaises(pagination.EmptyPage):
+            paginator.page(1).previous_page_number()
+
+
+class ConcurrentCountTest(TransactionTestCase):
+    # Other threads don't see the objects of the transaction of TestCase
+
+    def setUp(self):
+        default_cache.clear()
+        Book.objects.bulk_create([Book(title='book %s' % i) for i in range(25)])
+
+    def test_concurrent_count(self):
+        paginator = type('Pagination', (pagination.PageNumberPagination,), {
+            'concurrent_count': True, 'page_size': 10
+        })()
+        with patch.object(pagination.Paginator, 'start_count',
+                          autospec=True, side_effect=pagination.Paginator.start_count) as start:
+            results, data = paginate(paginator, Book.objects.order_by('pk'), page=2)
+
+        self.assertEqual(start.call_count, 1)
+        self.assertIsNotNone(paginator.page.paginator._count_future)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(data['count'], 25)
+
+    def test_atomic_block(self):
+        paginator = type('Pagination', (pagination.PageNumberPagination,), {
+            'concurrent_count': True, 'page_size': 10
+        })()
+        with transaction.atomic():
+            _, data = paginate(paginator, Book.objects.order_by('pk'))
+
+        self.assertIsNone(paginator.page.paginator._count_future)
+        self.assertEqual(data['count'], 25)
+
+
+class _BookView(object):
+    filter_backends = ()
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now().replace(microsecond=123456)
+        # Three books a second, so the primary key breaks the ties
+        Book.objects.bulk_create([
+            Book(title='book %02d' % i, created_at=now + datetime.timedelta(seconds=i // 3))
+            for i in range(25)
+        ])
+        self.ordered = list(Book.objects.order_by('-created_at', '-pk').values_list('pk',
+                                                                                     flat=True))
+
+    def get_page(self, queryset, url='/books', view=None, **params):
+        paginator = type('Pagination', (pagination.KeysetPagination,), {'page_size': 10})()
+        request = Request(factory.get(url, params))
+        results = paginator.paginate_queryset(queryset, request, view or _BookView())
+        return results, paginator.get_paginated_response(results).data
+
+    def walk(self, queryset, get_pk, view=None, **params):
+        """
+        Walks forward till the last page and then back to the first one
+        """
+        pages = []
+        results, data = self.get_page(queryset, view=view, **params)
+        pages.append([get_pk(item) for item in results])
+        self.assertIsNone(data['previous'])
+        while data['next']:
+            results, data = self.get_page(queryset, data['next'], view)
+            pages.append([get_pk(item) for item in results])
+
+        back = [pages[-1]]
+        while data['previous']:
+            results, data = self.get_page(queryset, data['previous'], view)
+            back.insert(0, [get_pk(item) for item in results])
+
+        self.assertEqual(back, pages)
+        return pages
+
+    def test_walk(self):
+        pages = self.walk(Book.objects.all(), lambda obj: obj.pk)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), self.ordered)
+
+    def test_values(self):
+        pages = self.walk(Book.objects.values('title'),
+                          lambda row: Book.objects.get(title=row['title']).pk)
+        self.assertEqual(sum(pages, []), self.ordered)
+
+        pages = self.walk(Book.objects.values_list('pk', flat=True), lambda pk: pk)
+        self.assertEqual(sum(pages, []), self.ordered)
+
+        results, data = self.get_page(Book.objects.values_list('title', 'pk'))
+        self.assertEqual(len(results[0]), 2)
+
+    def test_ordering_filter(self):
+        view = type('BookView', (), {'filter_backends': (filters.OrderingFilter,),
+                                     'ordering_fields': ('title', 'created_at')})()
+        # Ordering of the pagination without the ordering param and ordering of the view
+        pages = self.walk(Book.objects.all(), lambda obj: obj.pk, view)
+        self.assertEqual(sum(pages, []), self.ordered)
+
+        pages = self.walk(Book.objects.all(), lambda obj: obj.title, view, ordering='title')
+        self.assertEqual(sum(pages, []), sorted(Book.objects.values_list('title', flat=True)))
+
+        view.ordering = 'pk'
+        pages = self.walk(Book.objects.all(), lambda obj: obj.pk, view)
+        self.assertEqual(sum(pages, []), sorted(self.ordered))
+
+    def test_cursor(self):
+        _, data = self.get_page(Book.objects.all())
+        cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+
+        # Cursors are bound to the ordering
+        view = type('BookView', (), {'ordering': 'title'})()
+        with self.assertRaises(NotFound):
+            self.get_page(Book.objects.all(), view=view, cursor=cursor)
+        with self.assertRaises(NotFound):
+            self.get_page(Book.objects.all(), cursor='invalid')
+
+        # Past the end leads back
+        Book.objects.filter(pk__in=self.ordered[10:]).delete()
+        results, data = self.get_page(Book.objects.all(), cursor=cursor)
+        self.assertEqual(results, [])
+        self.assertIsNone(data['next'])
+        results, data = self.get_page(Book.objects.all(), data['previous'])
+        self.assertEqual([obj.pk for obj in results], self.ordered[:10])
+        self.assertIsNone(data['next'])
+        self.assertIsNone(data['previous'])
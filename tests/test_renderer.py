@@ -0,0 +1,166 @@
+import copy
+import json
+import unittest
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from mock import patch
+from rest_framework import serializers as rf_serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from drf_ext.core import helper, parsers, renderer, serializers
+from drf_ext.core.tests import TestCase
+
+
+def _is_installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+_sample_data = {
+    'results': [
+        {'id': 1, 'name': 'caf\u00e9 \u2028', 'price': Decimal('10.50'),
+         'created_at': datetime(2020, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+         'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'tags': ['a', None],
+         'ratio': 0.25, 'active': True},
+    ],
+    'count': 1,
+    'next': None,
+}
+
+
+class CamelCaseRendererTest(TestCase):
+    class UserSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = User
+            fields = ('id', 'first_name', 'last_name', 'date_joined')
+
+    def test_primed_once_per_class(self):
+        camel_case = renderer.CamelCaseJSONRenderer()
+        with patch.object(renderer.CamelCaseJSONRenderer, '_primed_classes', set()) as primed:
+            for fields in ('id', 'id,first_name', 'last_name', 'first_name,date_joined'):
+                camel_case.prime_serializer(self.UserSerializer.pruned_class(fields))
+
+            self.assertEqual(primed, {self.UserSerializer})
+        self.assertEqual(helper._camel_case_keys['date_joined'], 'dateJoined')
+
+    def test_primed_again_once_cleared(self):
+        camel_case = renderer.CamelCaseJSONRenderer()
+        with patch.object(renderer.CamelCaseJSONRenderer, '_primed_classes', set()) as primed, \
+                patch.dict(helper._camel_case_keys, clear=True), \
+                patch.object(helper, 'KEY_CACHE_SIZE', 4):
+            camel_case.prime_serializer(self.UserSerializer)
+            camel_case.prime_serializer(_ProfileSerializer)
+
+            # The key cache is started over by the second class
+            self.assertEqual(primed, {_ProfileSerializer})
+            self.assertNotIn('date_joined', helper._camel_case_keys)
+            camel_case.prime_serializer(self.UserSerializer)
+            self.assertEqual(primed, {self.UserSerializer})
+            self.assertIn('date_joined', helper._camel_case_keys)
+
+    def test_bounded(self):
+        camel_case = renderer.CamelCaseJSONRenderer()
+        with patch.object(renderer.CamelCaseJSONRenderer, '_primed_classes', set()) as primed, \
+                patch.object(serializers, 'CACHE_SIZE', 2):
+            for __ in range(5):
+                camel_case.prime_serializer(type('UserSerializer', (self.UserSerializer,), {}))
+                self.assertLessEqual(len(primed), 2)
+
+
+class _AddressSerializer(serializers.Serializer):
+    address_line_1 = rf_serializers.CharField()
+    is_2fa_enabled = rf_serializers.BooleanField()
+
+
+class _ProfileSerializer(serializers.Serializer):
+    first_name = rf_serializers.CharField()
+    addresses = _AddressSerializer(many=True)
+
+
+class CamelCaseParserTest(TestCase):
+    def parse(self, content, serializer_class=_ProfileSerializer):
+        view = SimpleNamespace(get_serializer_class=lambda: serializer_class)
+        return parsers.CamelCaseJSONParser().parse(BytesIO(content), parser_context={'view': view})
+
+    def test_field_names(self):
+        with patch.dict(helper._snake_case_keys, clear=True):
+            data = self.parse(b'{"firstName": "a", "otherKey": 1, '
+                              b'"addresses": [{"addressLine1": "b", "is2faEnabled": true}]}')
+
+        self.assertEqual(data, {'first_name': 'a', 'other_key': 1,
+                                'addresses': [{'address_line_1': 'b', 'is_2fa_enabled': True}]})
+
+    def test_round_trip(self):
+        data = {'first_name': 'a', 'addresses': [{'address_line_1': 'b', 'is_2fa_enabled': True}]}
+        rendered = renderer.CamelCaseJSONRenderer().render(copy.deepcopy(data))
+        self.assertIn(b'"addressLine1"', rendered)
+
+        self.assertEqual(self.parse(rendered)['data'], data)
+        # Pruned classes have the names of the class they're pruned from
+        self.assertEqual(self.parse(rendered, _ProfileSerializer.pruned_class('addresses'))['data'],
+                         data)
+
+
+class JSONRendererTest(TestCase):
+    def render(self, backend, data):
+        renderer.get_encoder_backend.cache_clear()
+        self.addCleanup(renderer.get_encoder_backend.cache_clear)
+        with override_settings(DRF_EXT_JSON_ENCODER=backend):
+            return renderer.JSONRenderer().render(data)
+
+    @unittest.skipUnless(_is_installed('orjson'), 'orjson is not installed')
+    def test_orjson(self):
+        rendered = self.render('orjson', copy.deepcopy(_sample_data))
+        self.assertEqual(rendered, self.render('json', copy.deepcopy(_sample_data)))
+
+        parsed = JSONParser().parse(BytesIO(rendered))
+        self.assertEqual(parsed['meta'], {'count': 1, 'next': None})
+        self.assertEqual(parsed['data'][0]['created_at'], '2020-01-02T03:04:05.678000Z')
+        self.assertEqual(parsed['data'][0]['price'], 10.5)
+        self.assertEqual(parsed['data'][0]['name'], 'caf\u00e9 \u2028')
+
+    def test_error(self):
+        rendered = self.render('auto', {'_context': 'error', 'detail': 'Not found.'})
+        self.assertEqual(JSONParser().parse(BytesIO(rendered)), {'error': {'detail': 'Not found.'}})
+
+
+class BinaryRendererTest(TestCase):
+    def assertRoundTrip(self, renderer_class, parser_class):
+        rendered = renderer_class().render(copy.deepcopy(_sample_data))
+        parsed = parser_class().parse(BytesIO(rendered))
+
+        self.assertEqual(parsed['meta'], {'count': 1, 'next': None})
+        self.assertEqual(len(parsed['data']), 1)
+        return parsed['data'][0]
+
+    @unittest.skipUnless(_is_installed('msgpack'), 'msgpack is not installed')
+    def test_msgpack(self):
+        item = self.assertRoundTrip(renderer.MessagePackRenderer, parsers.MessagePackParser)
+        # Same as JSON for the types MessagePack doesn't support
+        expected = json.loads(renderer.JSONRenderer().encode(_sample_data['results'][0]).decode())
+        self.assertEqual(item, expected)
+
+    @unittest.skipUnless(_is_installed('cbor2'), 'cbor2 is not installed')
+    def test_cbor(self):
+        item = self.assertRoundTrip(renderer.CBORRenderer, parsers.CBORParser)
+        self.assertEqual(item, _sample_data['results'][0])
+
+    @unittest.skipUnless(_is_installed('msgpack'), 'msgpack is not installed')
+    def test_error(self):
+        rendered = renderer.MessagePackRenderer().render({'_context': 'error', 'detail': 'Bad'})
+        self.assertEqual(parsers.MessagePackParser().parse(BytesIO(rendered)),
+                         {'error': {'detail': 'Bad'}})
+
+        with self.assertRaises(ParseError):
+            parsers.MessagePackParser().parse(BytesIO(b'\xc1'))
@@ -0,0 +1,203 @@
+import threading
+from types import SimpleNamespace
+
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mock import patch
+from rest_framework import serializers as rf_serializers
+from rest_framework.validators import UniqueValidator
+
+from drf_ext.core import compiler, serializers
+from drf_ext.core.tests import TestCase
+
+
+class FieldCloneTest(TestCase):
+    class CurrentUserSerializer(serializers.Serializer):
+        cache_fields = True
+        user = rf_serializers.HiddenField(default=rf_serializers.CurrentUserDefault())
+        tags = rf_serializers.ListField(child=rf_serializers.CharField(max_length=10))
+
+    class UserSerializer(serializers.ModelSerializer):
+        cache_fields = True
+
+        class Meta:
+            model = User
+            fields = ('id', 'username')
+            error_messages = {'username': {'blank': 'Username is required'}}
+
+    def test_no_shared_state(self):
+        first = self.UserSerializer().fields['username']
+        second = self.UserSerializer().fields['username']
+
+        self.assertIsNot(first, second)
+        unique = [[v for v in f.validators if isinstance(v, UniqueValidator)][0]
+                  for f in (first, second)]
+        self.assertIsNot(*unique)
+        self.assertEqual(first.error_messages['blank'], 'Username is required')
+        self.assertEqual(second.error_messages['blank'], 'Username is required')
+
+        first, second = self.CurrentUserSerializer().fields, self.CurrentUserSerializer().fields
+        self.assertIsNot(first['user'].default, second['user'].default)
+        self.assertIsNot(first['tags'].child, second['tags'].child)
+        self.assertEqual(first['tags'].child.max_length, 10)
+
+    def test_fields_per_instance(self):
+        class ContextSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = User
+                fields = ('id', 'username', 'email')
+
+            def get_field_names(self, declared_fields, info):
+                names = super().get_field_names(declared_fields, info)
+                return names if self.context.get('staff') else names[:2]
+
+        # Fields aren't cached by default, so they may depend on the instance
+        self.assertEqual(list(ContextSerializer().fields), ['id', 'username'])
+        self.assertEqual(list(ContextSerializer(context={'staff': True}).fields),
+                         ['id', 'username', 'email'])
+
+    def test_concurrent_serializers(self):
+        users = [User(pk=pk, username='user%s' % pk) for pk in range(1, 5)]
+        barrier = threading.Barrier(len(users))
+        leaked = []
+
+        def _validate(user):
+            for __ in range(50):
+                serializer = self.CurrentUserSerializer(
+                    data={'tags': ['a']}, context={'request': SimpleNamespace(user=user)}
+                )
+                barrier.wait()
+                serializer.is_valid(raise_exception=True)
+                if serializer.validated_data['user'] is not user:
+                    leaked.append(user)
+
+        threads = [threading.Thread(target=_validate, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(leaked, [])
+
+
+class ValuesPlanTest(TestCase):
+    class PermissionSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Permission
+            fields = ('id', 'codename', 'content_type')
+
+    class ContentTypeField(serializers.PrimaryKeyRelatedField):
+        def to_representation(self, value):
+            return 'ct-%s' % value.pk
+
+    def test_foreign_key_column(self):
+        serializer = self.PermissionSerializer()
+        self.assertTrue(compiler.is_pk_only_field(serializer.fields['content_type']))
+
+        plan = serializers.get_values_plan(serializer)
+        self.assertEqual(plan.columns, ['id', 'codename', 'content_type_id'])
+
+        permission = Permission.objects.order_by('pk')[0]
+        row = (permission.pk, permission.codename, permission.content_type_id)
+        self.assertEqual(plan.to_representation(row), serializer.to_representation(permission))
+
+    def test_overridden_representation(self):
+        serializer = self.PermissionSerializer()
+        serializer.fields['content_type'] = self.ContentTypeField(
+            queryset=ContentType.objects.all()
+        )
+
+        self.assertFalse(compiler.is_pk_only_field(serializer.fields['content_type']))
+        self.assertIsNone(serializers._get_values_column(serializer.fields['content_type'],
+                                                         Permission._meta))
+
+
+class _GroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'name')
+        list_serializer_class = serializers.BulkListSerializer
+        autoset_owner = True
+
+
+class BulkListSerializerTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='owner')
+        self.groups = [Group.objects.create(name='group%s' % i) for i in range(2)]
+        # Group standing in for a model having owner
+        owner_patcher = patch.object(Group, 'owner', True, create=True)
+        owner_patcher.start()
+        self.addCleanup(owner_patcher.stop)
+
+    def test_update_owner(self):
+        context = {'request': SimpleNamespace(user=self.user)}
+        serializer = _GroupSerializer(self.groups, data=[{'name': 'a'}, {'name': 'b'}],
+                                      many=True, context=context)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with patch.object(serializers, 'bulk_update') as bulk_update:
+            objs = serializer.save()
+
+        self.assertEqual([obj.owner for obj in objs], [self.user, self.user])
+        self.assertEqual(bulk_update.call_args[0][2], ['name', 'owner'])
+
+    def test_update_excluded_owner(self):
+        serializer_class = type('GroupSerializer', (_GroupSerializer,), {
+            'Meta': type('Meta', (_GroupSerializer.Meta,), {'exclude_on_update': ['owner']})
+        })
+        context = {'request': SimpleNamespace(user=self.user)}
+        serializer = serializer_class(self.groups, data=[{'name': 'a'}, {'name': 'b'}],
+                                      many=True, context=context)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with patch.object(serializers, 'bulk_update') as bulk_update:
+            serializer.save()
+
+        self.assertEqual(bulk_update.call_args[0][2], ['name'])
+
+
+class _BulkGroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'name')
+        list_serializer_class = serializers.BulkListSerializer
+
+
+class BulkUniqueTest(TestCase):
+    unique_error = {'name': ['group with this name already exists.']}
+
+    def test_duplicates_in_batch(self):
+        Group.objects.create(name='existing')
+        serializer = _BulkGroupSerializer(data=[{'name': 'dup'}, {'name': 'a'}, {'name': 'dup'},
+                                                {'name': 'existing'}, {'name': ''}], many=True)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[:4], [{}, {}, self.unique_error, self.unique_error])
+        self.assertEqual(list(serializer.errors[4]), ['name'])
+
+    def test_update(self):
+        groups = [Group.objects.create(name='group%s' % i) for i in range(3)]
+        data = [{'name': 'group0'}, {'name': 'new'}, {'name': 'group1'}]
+        serializer = _BulkGroupSerializer(groups, data=data, many=True)
+
+        # Keeping own value is fine, taking the value of other row isn't
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, [{}, {}, self.unique_error])
+
+    def test_queries(self):
+        data = [{'name': 'group%s' % i} for i in range(3000)]
+        serializer = _BulkGroupSerializer(data=data, many=True)
+
+        # Unique values are looked up by few IN queries, not by a query per item
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertLess(len(queries), 10)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertLess(len(inserts), 10)
+        self.assertEqual(Group.objects.count(), 3000)
@@ -0,0 +1,362 @@
+import datetime
+from types import SimpleNamespace
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache as default_cache
+from django.http import Http404
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from drf_ext.core import serializers, viewsets
+from drf_ext.core.routers import Router
+from drf_ext.core.tests import TestCase
+
+from .models import Author, Book
+from .views import BookViewSet, BulkBookViewSet
+
+
+class _UserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+
+
+class _GroupUserViewSet(viewsets.NestedViewSetMixin, viewsets.ModelViewSet):
+    queryset = User.objects.all()
+    serializer_class = _UserSerializer
+    permission_classes = ()
+    pagination_class = None
+    strict_parents = True
+
+
+class NestedViewSetTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.permission = Permission.objects.order_by('pk')[0]
+        self.group = Group.objects.create(name='group')
+        self.group.permissions.add(self.permission)
+        self.group.user_set.add(User.objects.create(username='user'))
+
+    def get_view(self, group_pk, permission_pk):
+        # /permissions/<pk>/groups/<pk>/users
+        return _GroupUserViewSet(
+            request=SimpleNamespace(user=None), action='list', format_kwarg=None,
+            kwargs={'parent_lookup_groups': group_pk,
+                    'parent_lookup_groups__permissions': permission_pk}
+        )
+
+    def test_parent_object(self):
+        view = self.get_view(self.group.pk, self.permission.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(view.get_parent_object(), self.group)
+            self.assertEqual(view.get_parent_object(), self.group)
+            self.assertTrue(view.parents_exist())
+        self.assertEqual(view.get_serializer_context()['parent'], self.group)
+
+    def test_missing_chain(self):
+        other = Permission.objects.exclude(pk=self.permission.pk)[0]
+        view = self.get_view(self.group.pk, other.pk)
+        with self.assertNumQueries(1):
+            self.assertRaises(Http404, view.get_parent_object)
+
+        with self.assertNumQueries(0):
+            self.assertRaises(Http404, self.get_view('x', other.pk).get_parent_object)
+
+    def test_list(self):
+        view = _GroupUserViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get('/permissions/1/groups/1/users')
+
+        # Existence check of the chain and the list
+        with self.assertNumQueries(2):
+            response = view(request, parent_lookup_groups=self.group.pk,
+                            parent_lookup_groups__permissions=self.permission.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        with self.assertNumQueries(1):
+            response = view(request, parent_lookup_groups=self.group.pk,
+                            parent_lookup_groups__permissions=0)
+        self.assertEqual(response.status_code, 404)
+
+
+class _UserViewSet(viewsets.ModelViewSet):
+    queryset = User.objects.all()
+    serializer_class = _UserSerializer
+    permission_classes = ()
+    lookup_field = 'email'
+    ownership_fields = ('is_staff', '__staff__')
+    conditional_field = 'last_login'
+
+
+class OnlyFieldsTest(TestCase):
+    def get_only_fields(self, path):
+        view = _UserViewSet(action='list', format_kwarg=None, kwargs={})
+        view.request = Request(APIRequestFactory().get(path))
+        return view.get_only_fields(view.get_queryset())
+
+    def test_view_fields(self):
+        self.assertEqual(set(self.get_only_fields('/users?fields=username')),
+                         {'username', 'email', 'is_staff', 'last_login'})
+        self.assertIsNone(self.get_only_fields('/users'))
+
+
+class _BookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('id', 'title')
+
+
+class _OwnerBookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'owner', 'author')
+
+
+class _OwnerBookViewSet(viewsets.ModelViewSet):
+    queryset = Book.objects.all()
+    serializer_class = _BookSerializer
+    owner_retrieve_serializer_class = _OwnerBookSerializer
+    ownership_fields = ('owner',)
+    permission_classes = ()
+
+    def retrieve(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return Response(self.get_serializer(self.object).data)
+
+
+class OwnerSerializerTest(TestCase):
+    def retrieve(self, book, user):
+        request = APIRequestFactory().get('/books/%s' % book.pk)
+        force_authenticate(request, user)
+        return _OwnerBookViewSet.as_view({'get': 'retrieve'})(request, pk=book.pk)
+
+    def test_retrieve(self):
+        owner, other = User.objects.create(username='owner'), User.objects.create(username='b')
+        book = Book.objects.create(title='book', owner=owner)
+
+        response = self.retrieve(book, owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': book.pk, 'title': 'book', 'owner': owner.pk,
+                                         'author': None})
+
+        response = self.retrieve(book, other)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': book.pk, 'title': 'book'})
+
+
+class _ConditionalBookViewSet(viewsets.ModelViewSet):
+    queryset = Book.objects.all()
+    serializer_class = _BookSerializer
+    permission_classes = ()
+    pagination_class = None
+    conditional = True
+
+
+class ConditionalTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        default_cache.clear()
+        self.book = Book.objects.create(title='book')
+
+    def request(self, view_class, method='get', action='retrieve', data=None, **headers):
+        view = view_class.as_view({method: action})
+        path = '/books/%s' % self.book.pk if action != 'list' else '/books'
+        request = getattr(APIRequestFactory(), method)(path, data, format='json', **headers)
+        return view(request, pk=self.book.pk) if action != 'list' else view(request)
+
+    def test_retrieve(self):
+        response = self.request(_ConditionalBookViewSet)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': self.book.pk, 'title': 'book'})
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Vary'], 'Authorization, Cookie')
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.request(_ConditionalBookViewSet, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.request(_ConditionalBookViewSet,
+                                HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        Book.objects.filter(pk=self.book.pk).update(
+            updated_at=self.book.updated_at + datetime.timedelta(seconds=1)
+        )
+        response = self.request(_ConditionalBookViewSet, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_retrieve_mixins(self):
+        view_class = type('BookViewSet', (_ConditionalBookViewSet,), {
+            'cache_responses': True, 'values_read': True
+        })
+        view_class.register_cache_models()
+
+        # Version and values of the object
+        with self.assertNumQueries(2):
+            response = self.request(view_class)
+        self.assertEqual(response.data, {'id': self.book.pk, 'title': 'book'})
+        etag = response['ETag']
+
+        # Version only, data is cached
+        with self.assertNumQueries(1):
+            response = self.request(view_class)
+        self.assertEqual(response.data, {'id': self.book.pk, 'title': 'book'})
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list(self):
+        response = self.request(_ConditionalBookViewSet, action='list')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Vary'], 'Authorization, Cookie')
+        etag = response['ETag']
+
+        response = self.request(_ConditionalBookViewSet, action='list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Representation of another serializer is another version
+        view_class = type('BookViewSet', (_ConditionalBookViewSet,), {
+            'serializer_class': _OwnerBookSerializer
+        })
+        response = self.request(view_class, action='list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        Book.objects.create(title='other')
+        response = self.request(_ConditionalBookViewSet, action='list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_match(self):
+        etag = self.request(_ConditionalBookViewSet)['ETag']
+
+        response = self.request(_ConditionalBookViewSet, 'put', 'update', {'title': 'new'},
+                                HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.request(_ConditionalBookViewSet)['ETag'], response['ETag'])
+
+        # Modified meanwhile
+        response = self.request(_ConditionalBookViewSet, 'put', 'update', {'title': 'stale'},
+                                HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        response = self.request(_ConditionalBookViewSet, 'delete', 'destroy', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Book.objects.get().title, 'new')
+
+        response = self.request(_ConditionalBookViewSet, 'delete', 'destroy', HTTP_IF_MATCH='*')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Book.objects.exists())
+
+
+class BulkTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='owner')
+        self.client.force_authenticate(self.user)
+        self.books = [Book.objects.create(title='book %s' % i, owner=self.user)
+                      for i in range(3)]
+
+    def test_method_map(self):
+        router = Router()
+        method_map = {'get': 'list', 'post': 'create'}
+        self.assertEqual(router.get_method_map(BulkBookViewSet, method_map),
+                         {'get': 'list', 'post': 'create', 'patch': 'bulk_partial_update',
+                          'delete': 'bulk_destroy'})
+        self.assertEqual(router.get_method_map(BookViewSet, method_map), method_map)
+
+        # Detail endpoint keeps its methods
+        detail_map = {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}
+        self.assertEqual(router.get_method_map(BulkBookViewSet, detail_map), detail_map)
+
+    def test_create(self):
+        response = self.client.post('/bulk-books', [
+            {'title': 'new', 'owner': self.user.pk}, {'title': 'other'}
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['title'] for item in response.data], ['new', 'other'])
+
+        # Nothing is written if any item is invalid
+        response = self.client.post('/bulk-books', [{'title': 'valid'}, {'title': ''}],
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertIn('title', response.data['items'][1])
+        self.assertFalse(Book.objects.filter(title='valid').exists())
+
+    def test_max_bulk_size(self):
+        response = self.client.post('/bulk-books', [{'title': 'new'}] * 4, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Book.objects.count(), 3)
+
+        response = self.client.delete('/bulk-books', [book.pk for book in self.books] * 2,
+                                      format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_partial_update(self):
+        first, second, third = self.books
+        response = self.client.patch('/bulk-books', [
+            {'id': first.pk, 'title': 'first'}, {'id': third.pk, 'title': 'third'}
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Book.objects.order_by('pk').values_list('title', flat=True)),
+                         ['first', 'book 1', 'third'])
+
+        # Missing object fails the whole request
+        response = self.client.patch('/bulk-books', [
+            {'id': second.pk, 'title': 'second'}, {'id': 0, 'title': 'missing'}
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertEqual(Book.objects.get(pk=second.pk).title, 'book 1')
+
+    def test_object_permissions(self):
+        other = Book.objects.create(title='other', owner=User.objects.create(username='other'))
+        first = self.books[0]
+
+        response = self.client.patch('/bulk-books', [
+            {'id': first.pk, 'title': 'first'}, {'id': other.pk, 'title': 'mine'}
+        ], format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Book.objects.get(pk=first.pk).title, 'book 0')
+        self.assertEqual(Book.objects.get(pk=other.pk).title, 'other')
+
+        response = self.client.delete('/bulk-books', [first.pk, {'id': other.pk}],
+                                      format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Book.objects.count(), 4)
+
+        response = self.client.delete('/bulk-books', [first.pk, {'id': self.books[1].pk}],
+                                      format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'id': first.pk}, {'id': self.books[1].pk}])
+        self.assertEqual(Book.objects.count(), 2)
+
+
+class _AuthorBookViewSet(viewsets.NestedViewSetMixin, BookViewSet):
+    bulk_actions = ('create',)
+
+
+class NestedBulkCreateTest(TestCase):
+    def create(self, author, data):
+        request = APIRequestFactory().post('/authors/%s/books' % author.pk, data, format='json')
+        return _AuthorBookViewSet.as_view({'post': 'create'})(request,
+                                                               parent_lookup_author=author.pk)
+
+    def test_create(self):
+        author = Author.objects.create(name='author')
+        response = self.create(author, [{'title': 'first'}, {'title': 'second'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(author.books.values_list('title', flat=True)), ['first', 'second'])
+
+    def test_invalid_items(self):
+        author = Author.objects.create(name='author')
+        response = self.create(author, [{'title': 'valid'}, 'invalid', None])
+        self.assertEqual(response.status_code, 400)
+        items = response.data['items']
+        self.assertEqual(items[0], {})
+        self.assertIn(api_settings.NON_FIELD_ERRORS_KEY, items[1])
+        self.assertTrue(items[2])
+        self.assertFalse(author.books.exists())
@@ -0,0 +1,12 @@
+from drf_ext.core.batch import BatchViewSet
+from drf_ext.core.routers import Router
+
+from . import views
+
+router = Router()
+router.register('books', views.BookViewSet)
+router.register('bulk-books', views.BulkBookViewSet, base_name='bulk-books')
+router.register('book-stream', views.BookStreamViewSet, base_name='book-stream')
+router.register('batch', BatchViewSet, base_name='batch')
+
+urlpatterns = router.urls
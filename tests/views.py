@@ -0,0 +1,38 @@
+from drf_ext.core import pagination, permissions, renderer, serializers, viewsets
+
+from .models import Book
+
+
+class BookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'author')
+
+
+class BookViewSet(viewsets.ModelViewSet):
+    queryset = Book.objects.order_by('pk')
+    serializer_class = BookSerializer
+    permission_classes = ()
+    pagination_class = None
+    conditional = True
+
+
+class BookStreamViewSet(BookViewSet):
+    renderer_classes = (renderer.JSONStreamRenderer,)
+    pagination_class = pagination.NoPagination
+    stream_list = True
+
+
+class BulkBookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'author', 'owner')
+
+
+class BulkBookViewSet(BookViewSet):
+    serializer_class = BulkBookSerializer
+    permission_classes = (permissions.IsOwnerPermissions,)
+    ownership_fields = ('owner',)
+    bulk_actions = ('create', 'partial_update', 'destroy')
+    max_bulk_size = 3
+    conditional = False